@@ -0,0 +1,170 @@
+import bisect
+import threading
+
+# Latency histogram bucket upper bounds in seconds (5us .. 1s)
+DEFAULT_BUCKETS = (
+    0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0
+)
+
+
+class Histogram:
+    """Fixed-bucket histogram of observed values"""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        # One count per bucket plus the +Inf bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """Record one value"""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self):
+        """(upper bound, cumulative count) pairs, ending with +Inf"""
+        pairs = []
+        total = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+    def quantile(self, fraction):
+        """Upper bound of the bucket holding the given quantile"""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        for bound, total in self.cumulative():
+            if total >= rank:
+                return bound
+        return float("inf")
+
+
+class PipelineMetrics:
+    """
+    Per-stage timings and counters for the chatbot response pipeline
+
+    Stage latencies are aggregated into histograms; counters and gauges carry
+    optional labels. Collectors registered with add_collector are called
+    before every snapshot or export to refresh gauges (e.g. cache stats).
+    """
+
+    def __init__(self, namespace="chatbot", buckets=DEFAULT_BUCKETS):
+        """
+        Parameters:
+            namespace (str): Prefix for exported metric names
+            buckets (tuple): Histogram bucket upper bounds in seconds
+        """
+        self.namespace = namespace
+        self.buckets = tuple(buckets)
+        self._stages = {}
+        self._counters = {}
+        self._gauges = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def observe(self, stage, seconds):
+        """Record the duration of one pipeline stage"""
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def increment(self, name, amount=1, **labels):
+        """Add to a counter"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def set_counter(self, name, value, **labels):
+        """Set a counter to a running total kept elsewhere (e.g. by a cache)"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = value
+
+    def set_gauge(self, name, value, **labels):
+        """Set a gauge to its current value"""
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._gauges[key] = value
+
+    def add_collector(self, collector):
+        """Register a callable(metrics) run before each snapshot or export"""
+        self._collectors.append(collector)
+
+    def remove_collector(self, collector):
+        """Unregister a collector added with add_collector"""
+        if collector in self._collectors:
+            self._collectors.remove(collector)
+
+    def reset(self):
+        """Drop all recorded values"""
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+            self._gauges.clear()
+
+    def snapshot(self):
+        """Return the current metrics as plain Python data"""
+        self._collect()
+        with self._lock:
+            stages = {
+                stage: {
+                    "count": histogram.count,
+                    "sum_seconds": histogram.sum,
+                    "mean_seconds": histogram.sum / histogram.count if histogram.count else None,
+                    "p50_seconds": histogram.quantile(0.50),
+                    "p99_seconds": histogram.quantile(0.99),
+                    "buckets": histogram.cumulative(),
+                }
+                for stage, histogram in self._stages.items()
+            }
+            counters = {self._series(name, labels): value for (name, labels), value in self._counters.items()}
+            gauges = {self._series(name, labels): value for (name, labels), value in self._gauges.items()}
+        return {"stages": stages, "counters": counters, "gauges": gauges}
+
+    def prometheus_text(self):
+        """Render the metrics in the Prometheus text exposition format"""
+        self._collect()
+        lines = []
+        with self._lock:
+            if self._stages:
+                name = "{}_stage_seconds".format(self.namespace)
+                lines.append("# HELP {} Time spent in each response pipeline stage.".format(name))
+                lines.append("# TYPE {} histogram".format(name))
+                for stage, histogram in sorted(self._stages.items()):
+                    for bound, total in histogram.cumulative():
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append('{}_bucket{{stage="{}",le="{}"}} {}'.format(name, stage, le, total))
+                    lines.append('{}_sum{{stage="{}"}} {!r}'.format(name, stage, histogram.sum))
+                    lines.append('{}_count{{stage="{}"}} {}'.format(name, stage, histogram.count))
+
+            lines.extend(self._render(self._counters, "counter", "_total"))
+            lines.extend(self._render(self._gauges, "gauge", ""))
+        return "\n".join(lines) + "\n"
+
+    def _collect(self):
+        for collector in self._collectors:
+            collector(self)
+
+    def _render(self, values, metric_type, suffix):
+        lines = []
+        declared = set()
+        for (name, labels), value in sorted(values.items()):
+            full_name = "{}_{}{}".format(self.namespace, name, suffix)
+            if full_name not in declared:
+                lines.append("# TYPE {} {}".format(full_name, metric_type))
+                declared.add(full_name)
+            lines.append("{} {!r}".format(self._series(full_name, labels), value))
+        return lines
+
+    @staticmethod
+    def _series(name, labels):
+        if not labels:
+            return name
+        return "{}{{{}}}".format(name, ",".join('{}="{}"'.format(key, value) for key, value in labels))
@@ -1,10 +1,18 @@
+import queue
+import threading
 import tkinter as tk
 from tkinter import scrolledtext, messagebox, ttk
 from main_code import EntityAwareChatbot
 
 class AdvancedChatbotUI:
-    def __init__(self, root):
+    # How often the Tk main loop checks for results from the worker (ms)
+    POLL_INTERVAL_MS = 50
+
+    def __init__(self, root, max_scrollback_lines=2000):
+        if max_scrollback_lines < 1:
+            raise ValueError(f"max_scrollback_lines must be at least 1, got {max_scrollback_lines!r}")
         self.root = root
+        self.max_scrollback_lines = max_scrollback_lines
         self.root.title("Customer Support Chatbot")
         self.root.geometry("600x500")
         self.root.minsize(500, 400)
@@ -16,8 +24,15 @@ class AdvancedChatbotUI:
         style.configure("TEntry", font=("Arial", 12))
         style.configure("TLabel", font=("Arial", 12))
 
-        # Initialize chatbot
-        self.chatbot = EntityAwareChatbot()
+        # The chatbot is loaded and queried on a worker thread so the UI never blocks
+        self.chatbot = None
+        # Set when loading failed; the worker has exited and no input is accepted
+        self.unavailable = False
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.pending_requests = 0
+        self.pending_messages = []
+        self.worker = threading.Thread(target=self.run_worker, daemon=True)
 
         # Header
         self.header = tk.Label(
@@ -33,6 +48,10 @@ class AdvancedChatbotUI:
         )
         self.chat_display.pack(padx=10, pady=(10, 5), fill=tk.BOTH, expand=True)
 
+        # Loading / typing indicator
+        self.status = ttk.Label(root, text="Loading model...", foreground="gray")
+        self.status.pack(padx=10, anchor="w")
+
         # User input frame
         self.input_frame = ttk.Frame(root)
         self.input_frame.pack(pady=10, fill=tk.X)
@@ -66,23 +85,94 @@ class AdvancedChatbotUI:
         # Welcome message
         self.display_message("Bot", "Hello! How can I assist you today?")
 
+        # Start loading the model and listening for results
+        self.worker.start()
+        self.root.after(self.POLL_INTERVAL_MS, self.poll_results)
+
+    def run_worker(self):
+        """Load the chatbot, then answer queued messages (runs off the Tk thread)."""
+        try:
+            self.chatbot = EntityAwareChatbot()
+        except Exception as error:
+            self.results.put(("error", f"Could not load the chatbot: {error}"))
+            return
+        self.results.put(("ready", None))
+
+        while True:
+            user_message = self.requests.get()
+            if user_message is None:
+                break
+            try:
+                self.results.put(("response", self.chatbot.get_response(user_message)))
+            except Exception as error:
+                self.results.put(("response", f"Sorry, something went wrong: {error}"))
+
+    def poll_results(self):
+        """Show results posted by the worker; Tk widgets are only touched here."""
+        try:
+            while True:
+                kind, payload = self.results.get_nowait()
+                if kind == "response":
+                    self.pending_requests -= 1
+                    self.display_message("Bot", payload)
+                elif kind == "error":
+                    self.unavailable = True
+                    self.user_input.config(state='disabled')
+                    self.send_button.config(state='disabled')
+                    self.display_message("Bot", payload)
+                    self.update_status()
+                    messagebox.showerror("Chatbot", payload)
+                    return
+                self.update_status()
+        except queue.Empty:
+            pass
+        self.root.after(self.POLL_INTERVAL_MS, self.poll_results)
+
+    def update_status(self):
+        """Show whether the bot is unavailable, still loading or typing."""
+        if self.unavailable:
+            self.status.config(text="Chatbot unavailable")
+        elif self.chatbot is None:
+            self.status.config(text="Loading model...")
+        elif self.pending_requests:
+            self.status.config(text="Bot is typing...")
+        else:
+            self.status.config(text="")
+
     def display_message(self, sender, message):
         """Display a message in the chat display area."""
+        # Batch inserts: messages arriving together are written in one update
+        self.pending_messages.append(f"{sender}: {message}\n")
+        if len(self.pending_messages) == 1:
+            self.root.after_idle(self.flush_messages)
+
+    def flush_messages(self):
+        """Write pending messages and trim the transcript to the scrollback limit."""
+        text, self.pending_messages = "".join(self.pending_messages), []
         self.chat_display.config(state='normal')
-        self.chat_display.insert(tk.END, f"{sender}: {message}\n")
+        self.chat_display.insert(tk.END, text)
+
+        # Drop the oldest lines beyond the scrollback limit; every message ends
+        # with "\n", so 'end-2c' is on the last transcript line ('end-1c' is
+        # on the empty line after it)
+        lines = int(self.chat_display.index('end-2c').split('.')[0])
+        if lines > self.max_scrollback_lines:
+            self.chat_display.delete('1.0', f"{lines - self.max_scrollback_lines + 1}.0")
+
         self.chat_display.config(state='disabled')
         self.chat_display.yview(tk.END)
 
     def send_message(self, event=None):
         """Handle sending a message."""
         user_message = self.user_input.get().strip()
-        if user_message:
+        if user_message and not self.unavailable:
             # Display user message
             self.display_message("You", user_message)
 
-            # Get chatbot response
-            bot_response = self.chatbot.get_response(user_message)
-            self.display_message("Bot", bot_response)
+            # Ask the worker for a response; it is shown by poll_results
+            self.pending_requests += 1
+            self.requests.put(user_message)
+            self.update_status()
 
             # Clear input field
             self.user_input.delete(0, tk.END)
@@ -90,6 +180,7 @@ class AdvancedChatbotUI:
     def clear_chat(self):
         """Clear the chat display area."""
         if messagebox.askyesno("Clear Chat", "Are you sure you want to clear the chat?"):
+            self.pending_messages = []
             self.chat_display.config(state='normal')
             self.chat_display.delete(1.0, tk.END)
             self.chat_display.config(state='disabled')
@@ -98,6 +189,7 @@ class AdvancedChatbotUI:
     def exit_app(self):
         """Exit the application."""
         if messagebox.askyesno("Exit", "Are you sure you want to exit?"):
+            self.requests.put(None)
             self.root.quit()
 
 if __name__ == "__main__":
@@ -1,31 +1,1183 @@
+import bisect
+import codecs
+import hashlib
+import heapq
+import itertools
 import json
+import logging
+import mmap
+import os
+import pickle
 import random
 import re
+import sys
+import threading
+import time
+import tracemalloc
+from array import array
+from collections import Counter, OrderedDict, deque
+from types import MappingProxyType
 import nltk
 from nltk.stem import WordNetLemmatizer
 import string
 
-# Download necessary NLTK data
-nltk.download('all')
+from chatbot_metrics import PipelineMetrics
+
+try:
+    import numpy as np
+except ImportError:  # Only needed for classify_batch
+    np = None
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; load_stats then omit max RSS
+    resource = None
+
+# NLTK data the chatbot needs: (resource path, downloader package) alternatives.
+# NLTK releases with PunktTokenizer (3.8.2+) tokenize with punkt_tab only and
+# cannot use the older punkt pickles, so only the installed release's data counts.
+if hasattr(nltk.tokenize, 'PunktTokenizer'):
+    _NLTK_TOKENIZER_RESOURCE = ('tokenizers/punkt_tab/english/', 'punkt_tab')
+else:
+    _NLTK_TOKENIZER_RESOURCE = ('tokenizers/punkt', 'punkt')
+NLTK_RESOURCES = {
+    'tokenizer': [_NLTK_TOKENIZER_RESOURCE],
+    'lemmatizer': [('corpora/wordnet', 'wordnet')],
+}
+
+# Optional local NLTK data directory (e.g. on offline hosts)
+NLTK_DATA_ENV = 'CHATBOT_NLTK_DATA'
+# Set to "0" to never download missing NLTK data
+NLTK_DOWNLOAD_ENV = 'CHATBOT_NLTK_DOWNLOAD'
+
+# Precompiled intent-model snapshots: magic, then a SHA-256 key, then a pickle
+SNAPSHOT_MAGIC = b'CHATSNAP'
+SNAPSHOT_VERSION = 4
+SNAPSHOT_SUFFIX = '.snapshot'
+SNAPSHOT_HEADER_SIZE = len(SNAPSHOT_MAGIC) + hashlib.sha256().digest_size
+
+# Tokenizers for SimplePatternChatbot(tokenizer=...): NLTK's word_tokenize or
+# fast_word_tokenize, which gives the same tokens in a single regex pass
+TOKENIZERS = ('nltk', 'fast')
+
+# Minimum keyword score for an intent to match
+MATCH_THRESHOLD = 0.3
+
+# Fuzzy keyword matching: (minimum token length, allowed edit distance) steps,
+# and the per-query cost budget in keyword comparisons
+FUZZY_DISTANCE_LIMITS = ((4, 1), (8, 2))
+FUZZY_BUDGET = 5000
+
+# Session used when get_response is called without a session id
+DEFAULT_SESSION = 'default'
+
+# Entity patterns recognized by EntityAwareChatbot
+ENTITY_PATTERNS = {
+    'order_number': r'order\s+(?:number|#)?\s*(\w{6,12})',
+    'email': r'[\w\.-]+@[\w\.-]+\.\w+',
+    'product_code': r'product\s+(?:code|#)?\s*(\w{3,10})',
+    'date': r'(\d{1,2})[\/\-](\d{1,2})(?:[\/\-](\d{2,4}))?'
+}
+
+# Common words ignored during keyword matching (simple approach)
+STOPWORDS = frozenset([
+    "i", "me", "my", "myself", "we", "our", "ours", "ourselves", "you",
+    "your", "yours", "yourself", "yourselves", "he", "him", "his",
+    "himself", "she", "her", "hers", "herself", "it", "its", "itself",
+    "they", "them", "their", "theirs", "themselves", "what", "which",
+    "who", "whom", "this", "that", "these", "those", "am", "is", "are",
+    "was", "were", "be", "been", "being", "have", "has", "had", "having",
+    "do", "does", "did", "doing", "a", "an", "the", "and", "but", "if",
+    "or", "because", "as", "until", "while", "of", "at", "by", "for",
+    "with", "about", "against", "between", "into", "through", "during",
+    "before", "after", "above", "below", "to", "from", "up", "down",
+    "in", "out", "on", "off", "over", "under", "again", "further",
+    "then", "once", "here", "there", "when", "where", "why", "how",
+    "all", "any", "both", "each", "few", "more", "most", "other",
+    "some", "such", "no", "nor", "not", "only", "own", "same", "so",
+    "than", "too", "very", "s", "t", "can", "will", "just", "don",
+    "should", "now", "d", "ll", "m", "o", "re", "ve", "y", "ain", "aren",
+    "couldn", "didn", "doesn", "hadn", "hasn", "haven", "isn", "ma",
+    "mightn", "mustn", "needn", "shan", "shouldn", "wasn", "weren",
+    "won", "wouldn"
+])
+
+logger = logging.getLogger(__name__)
+
+_nltk_lock = threading.Lock()
+_nltk_ready = False
+
+
+def _find_nltk_resource(alternatives):
+    """Return the first available resource of the alternatives, or None"""
+    for path, package in alternatives:
+        try:
+            nltk.data.find(path)
+            return package
+        except LookupError:
+            continue
+    return None
+
+
+def ensure_nltk_resources(data_dir=None, download=None):
+    """
+    Make sure the NLTK data used by the chatbot is available
+    
+    Only the tokenizer (punkt_tab, or punkt on NLTK before 3.8.2) and WordNet
+    are needed. They are looked up in data_dir (or $CHATBOT_NLTK_DATA) first,
+    then in NLTK's default locations, and downloaded into data_dir if missing
+    and downloading is allowed.
+    
+    Parameters:
+        data_dir (str): Local NLTK data directory to search and download into
+        download (bool): Whether missing data may be downloaded
+                         (defaults to $CHATBOT_NLTK_DOWNLOAD != "0")
+    
+    Raises:
+        LookupError: If a required resource is missing and cannot be downloaded
+    """
+    global _nltk_ready
+    
+    with _nltk_lock:
+        if _nltk_ready:
+            return
+        
+        data_dir = data_dir or os.environ.get(NLTK_DATA_ENV)
+        if data_dir and data_dir not in nltk.data.path:
+            nltk.data.path.insert(0, data_dir)
+        if download is None:
+            download = os.environ.get(NLTK_DOWNLOAD_ENV, '1') != '0'
+        
+        missing = []
+        for role, alternatives in NLTK_RESOURCES.items():
+            if _find_nltk_resource(alternatives):
+                continue
+            
+            if download:
+                package = alternatives[0][1]
+                logger.info("Downloading NLTK resource %r", package)
+                nltk.download(package, download_dir=data_dir, quiet=True)
+                if _find_nltk_resource(alternatives):
+                    continue
+            
+            missing.append((role, alternatives[0][1]))
+        
+        if missing:
+            packages = " ".join(package for _, package in missing)
+            raise LookupError(
+                "Missing NLTK data for the chatbot: {}. Install it with "
+                "'python -m nltk.downloader -d <dir> {}' and point ${} at <dir>.".format(
+                    ", ".join("{} ({})".format(package, role) for role, package in missing),
+                    packages, NLTK_DATA_ENV
+                )
+            )
+        
+        _nltk_ready = True
+
+
+# Single-pass equivalent of NLTK's Treebank word tokenizer rules for the
+# characters allowed by _FAST_UNSAFE_RE
+_FAST_TOKEN_RE = re.compile(r"""
+    \.{2,}                              # ellipsis
+  | --                                  # double dash
+  | [;@#$%&?!*\[\](){}<>]               # always split off
+  | [,:](?!\d)                          # comma or colon, unless before a digit (3,000 10:30)
+  | \.(?=[\])}>]*\s*$)                  # final period
+  | (?:(?!--|\.\.|\.[\])}>]*\s*$)(?:[,:](?=\d)|[^\s;@#$%&?!*\[\](){}<>,:]))+
+""", re.VERBOSE)
+
+# Inputs the fast path does not reproduce exactly; these go to NLTK
+_FAST_UNSAFE_RE = re.compile(r"""
+    [^ -!#-_a-~\t\n\r]                  # non-ASCII, control characters, " and `
+  | (?<!\w)'|'(?!\w)                    # quotes other than in-word apostrophes
+  | [,:][,:]
+  | \.[\])}>]*\s+\S                     # a period before more text may end a sentence
+  | \.[?!)";}\]*:@'({\[]
+""", re.VERBOSE)
+
+# Clitics split off like NLTK's ending-quote rules (applied to space-joined tokens)
+_CLITIC_RES = (
+    re.compile(r"([^' ])('[sS]|'[mM]|'[dD]|') "),
+    re.compile(r"([^' ])('ll|'LL|'re|'RE|'ve|'VE|n't|N'T) "),
+)
+
+# NLTK's MacIntyre contractions (cannot -> can not, gonna -> gon na, ...)
+_CONTRACTION_HINT_RE = re.compile(r"(?i)cannot|d'ye|gimme|gonna|gotta|lemme|more'n|wanna")
+_CONTRACTION_RES = tuple(re.compile(pattern) for pattern in (
+    r"(?i)\b(can)(not)\b",
+    r"(?i)\b(d)('ye)\b",
+    r"(?i)\b(gim)(me)\b",
+    r"(?i)\b(gon)(na)\b",
+    r"(?i)\b(got)(ta)\b",
+    r"(?i)\b(lem)(me)\b",
+    r"(?i)\b(more)('n)\b",
+    r"(?i)\b(wan)(na)(?=\s)",
+))
+
+
+def fast_path_supported(text):
+    """Whether fast_word_tokenize handles text without falling back to NLTK"""
+    return _FAST_UNSAFE_RE.search(text) is None
+
+
+def fast_word_tokenize(text):
+    """
+    Tokenize text exactly like nltk.word_tokenize, without NLTK for plain messages
+    
+    Short ASCII messages are tokenized with one precompiled regex. Text that
+    punkt might split into sentences mid-way (a period followed by more
+    text), quotes, and non-ASCII characters fall back to nltk.word_tokenize.
+    """
+    if _FAST_UNSAFE_RE.search(text):
+        return nltk.word_tokenize(text)
+    
+    tokens = _FAST_TOKEN_RE.findall(text)
+    has_contraction = _CONTRACTION_HINT_RE.search(text) is not None
+    if "'" not in text and not has_contraction:
+        return tokens
+    
+    joined = " {} ".format(" ".join(tokens))
+    for pattern in _CLITIC_RES:
+        joined = pattern.sub(r"\1 \2 ", joined)
+    if has_contraction:
+        for pattern in _CONTRACTION_RES:
+            joined = pattern.sub(r" \1 \2 ", joined)
+    return joined.split()
+
+
+# Characters that can follow a JSON number
+_JSON_NUMBER_END_RE = re.compile(r'[\s,\]}]')
+
+
+class _JSONStream:
+    """Incremental reader over the text of a JSON document read in chunks"""
+    
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+    
+    def _fill(self):
+        """Read one more chunk, dropping the consumed part of the buffer"""
+        chunk = next(self.chunks, None)
+        if chunk is None:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        return True
+    
+    def _error(self, message):
+        return json.JSONDecodeError(message, self.buffer, self.position)
+    
+    def next_char(self):
+        """Consume whitespace and return the next character ('' at the end)"""
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in ' \t\n\r':
+                self.position += 1
+            if self.position < len(self.buffer):
+                char = self.buffer[self.position]
+                self.position += 1
+                return char
+            if not self._fill():
+                return ''
+    
+    def peek(self):
+        """Return the next non-whitespace character without consuming it"""
+        char = self.next_char()
+        if char:
+            self.position -= 1
+        return char
+    
+    def expect(self, expected):
+        char = self.next_char()
+        if char != expected:
+            raise self._error("Expected {!r}, found {!r}".format(expected, char))
+    
+    def value(self):
+        """Decode the next JSON value, reading more chunks until it is complete"""
+        # A prefix of a number ("1.", "2e") decodes as a shorter number, so
+        # numbers are only decoded once the text after them is buffered
+        if self.peek() in '-0123456789':
+            while not _JSON_NUMBER_END_RE.search(self.buffer, self.position) and self._fill():
+                pass
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            self.position = end
+            return value
+
+
+def _read_chunks(file, digest, chunk_size):
+    """Decoded text chunks of a binary file, feeding every byte to digest"""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')()
+    while True:
+        chunk = file.read(chunk_size)
+        if digest is not None:
+            digest.update(chunk)
+        if not chunk:
+            tail = decoder.decode(b'', final=True)
+            if tail:
+                yield tail
+            return
+        yield decoder.decode(chunk)
+
+
+def iter_intents(data_file, data_format=None, digest=None, chunk_size=1 << 16):
+    """
+    Stream the intents of a catalog file one at a time
+    
+    JSON catalogs are scanned incrementally for the top-level "intents" array
+    and its items are decoded one by one; JSONL catalogs hold one intent
+    object per line. Only the intent being decoded is held in memory.
+    
+    Parameters:
+        data_file (str): Catalog file
+        data_format (str): 'json' or 'jsonl' (default: from the file extension)
+        digest: hashlib object updated with every byte read
+        chunk_size (int): Bytes read at a time
+    """
+    if data_format is None:
+        data_format = 'jsonl' if data_file.endswith(('.jsonl', '.ndjson')) else 'json'
+    
+    with open(data_file, 'rb') as file:
+        if data_format == 'jsonl':
+            for line in file:
+                if digest is not None:
+                    digest.update(line)
+                if line.strip():
+                    yield json.loads(line)
+            return
+        
+        stream = _JSONStream(_read_chunks(file, digest, chunk_size))
+        stream.expect('{')
+        if stream.peek() == '}':
+            stream.next_char()
+            return
+        while True:
+            key = stream.value()
+            stream.expect(':')
+            if key != 'intents':
+                stream.value()
+            else:
+                stream.expect('[')
+                if stream.peek() == ']':
+                    stream.next_char()
+                else:
+                    while True:
+                        yield stream.value()
+                        separator = stream.next_char()
+                        if separator == ']':
+                            break
+                        if separator != ',':
+                            raise stream._error("Expected ',' or ']' in the intents array")
+            separator = stream.next_char()
+            if separator == '}':
+                break
+            if separator != ',':
+                raise stream._error("Expected ',' or '}' in the catalog object")
+        # Drain the file so the digest covers every byte
+        while stream._fill():
+            pass
+
+
+def _max_rss_kb():
+    """Peak resident set size of this process in KiB, or None if unavailable"""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return max_rss // 1024 if sys.platform == 'darwin' else max_rss
+
+
+class LRUCache:
+    """Thread-safe bounded mapping that evicts the least recently used entries"""
+    
+    def __init__(self, maxsize=1024):
+        """
+        Parameters:
+            maxsize (int): Maximum number of entries (0 disables caching)
+        """
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key, default=None):
+        """Return the cached value for key and mark it as recently used"""
+        with self._lock:
+            try:
+                value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def put(self, key, value):
+        """Cache a value, evicting the least recently used entry when full"""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+    
+    def clear(self):
+        """Drop all entries and reset the counters"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+    
+    def stats(self):
+        """Return size and hit/miss/eviction counters"""
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+    
+    def __len__(self):
+        return len(self._entries)
+
+
+class EntityScanner:
+    """
+    Extract the first match of every entity type from precompiled patterns
+    
+    Each pattern is compiled once and searched only up to its first match,
+    instead of materializing every match with re.findall. Per-type searches
+    keep the regex engine's literal-prefix scanning (e.g. for "order"), which
+    measured faster than one combined alternation of lookaheads. The result is
+    the same as taking the first re.findall match of each pattern.
+    """
+    
+    def __init__(self, patterns=None, flags=re.IGNORECASE):
+        """
+        Parameters:
+            patterns (dict): Entity type -> regular expression
+            flags (int): Regex flags applied to every pattern
+        """
+        self.flags = flags
+        self._patterns = {}
+        # (entity type, compiled pattern, group count), in registration order
+        self._compiled = ()
+        for entity_type, pattern in (patterns or {}).items():
+            self.register(entity_type, pattern)
+    
+    @property
+    def patterns(self):
+        """Read-only view of the registered entity patterns"""
+        return MappingProxyType(self._patterns)
+    
+    def register(self, entity_type, pattern):
+        """Add or replace an entity type at runtime"""
+        compiled = re.compile(pattern, self.flags)
+        self._patterns[entity_type] = pattern
+        # Swap in a new tuple so concurrent scans never see a partial update
+        entries = {entry[0]: entry for entry in self._compiled}
+        entries[entity_type] = (entity_type, compiled, compiled.groups)
+        self._compiled = tuple(entries[name] for name in self._patterns)
+    
+    def scan(self, text):
+        """Return {entity type: first match} for the entity types found in text"""
+        found = {}
+        for entity_type, compiled, groups in self._compiled:
+            match = compiled.search(text)
+            if match is None:
+                continue
+            
+            # Mirror re.findall: whole match, the only group, or a tuple of groups
+            if groups == 0:
+                found[entity_type] = match.group(0)
+            elif groups == 1:
+                found[entity_type] = match.groups('')[0]
+            else:
+                found[entity_type] = match.groups('')
+        return found
+
+
+class ConversationSession:
+    """Per-conversation state: intent context and extracted entities"""
+    
+    def __init__(self):
+        self.context = {
+            "current_intent": None,
+            "previous_intents": []
+        }
+        self.entities = {}
+        self.last_access = time.monotonic()
+    
+    def estimated_size(self):
+        """Rough memory footprint of the session in bytes"""
+        size = sys.getsizeof(self) + sys.getsizeof(self.context) + sys.getsizeof(self.entities)
+        size += sys.getsizeof(self.context["previous_intents"])
+        for value in self.entities.values():
+            size += sys.getsizeof(value)
+        return size
+
+
+class SessionStore:
+    """
+    Thread-safe store of conversation sessions keyed by session id
+    
+    Sessions idle for longer than ttl seconds are expired, and the least
+    recently used sessions are evicted when there are more than max_sessions
+    of them or their estimated size exceeds max_bytes.
+    """
+    
+    def __init__(self, ttl=1800, max_sessions=10000, max_bytes=None):
+        """
+        Parameters:
+            ttl (float): Idle seconds before a session expires (None disables)
+            max_sessions (int): Maximum number of live sessions, at least 1 (None disables)
+            max_bytes (int): Approximate memory cap for all sessions (None disables)
+        """
+        if max_sessions is not None and max_sessions < 1:
+            raise ValueError("max_sessions must be at least 1 (or None), got {!r}".format(max_sessions))
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.expired = 0
+        self.evicted = 0
+        self._sessions = OrderedDict()
+        self._sizes = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+    
+    def get(self, session_id):
+        """Return the session for session_id, creating it if needed"""
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is not None and self._is_expired(session, now):
+                self._remove(session_id)
+                self.expired += 1
+                session = None
+            
+            if session is None:
+                session = ConversationSession()
+                self._sessions[session_id] = session
+            else:
+                self._sessions.move_to_end(session_id)
+            
+            session.last_access = now
+            self._resize(session_id, session)
+            self._evict(now)
+            return session
+    
+    def update_size(self, session_id, session):
+        """
+        Re-measure a session after a request changed it, evicting if over a cap
+        
+        Sizes are otherwise only taken in get(), before the request adds to
+        the session.
+        """
+        with self._lock:
+            if self._sessions.get(session_id) is not session:
+                return
+            self._resize(session_id, session)
+            self._evict(time.monotonic())
+    
+    def drop(self, session_id):
+        """Forget a session"""
+        with self._lock:
+            if session_id in self._sessions:
+                self._remove(session_id)
+    
+    def stats(self):
+        """Return session counts and the estimated memory in use"""
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "estimated_bytes": self._total_bytes,
+                "expired": self.expired,
+                "evicted": self.evicted,
+            }
+    
+    def __len__(self):
+        return len(self._sessions)
+    
+    def __contains__(self, session_id):
+        return session_id in self._sessions
+    
+    def _is_expired(self, session, now):
+        return self.ttl is not None and now - session.last_access > self.ttl
+    
+    def _resize(self, session_id, session):
+        size = session.estimated_size()
+        self._total_bytes += size - self._sizes.get(session_id, 0)
+        self._sizes[session_id] = size
+    
+    def _remove(self, session_id):
+        del self._sessions[session_id]
+        self._total_bytes -= self._sizes.pop(session_id)
+    
+    def _evict(self, now):
+        # Least recently used sessions come first, so expired ones do too
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if self._is_expired(session, now):
+                self.expired += 1
+            elif ((self.max_sessions is not None and len(self._sessions) > self.max_sessions)
+                    or (self.max_bytes is not None and self._total_bytes > self.max_bytes
+                        and len(self._sessions) > 1)):
+                self.evicted += 1
+            else:
+                break
+            self._remove(session_id)
+
+
+class Vocabulary:
+    """
+    Interns tokens to small integer ids
+    
+    Ids are assigned in first-seen order and never change, so a vocabulary
+    can be shared by several models (and grow while they are in use).
+    """
+    
+    def __init__(self, tokens=()):
+        self.ids = {}
+        self.tokens = []
+        self._lock = threading.Lock()
+        for token in tokens:
+            self.intern(token)
+    
+    def intern(self, token):
+        """Return the id of token, assigning a new one if needed"""
+        token_id = self.ids.get(token)
+        if token_id is None:
+            with self._lock:
+                token_id = self.ids.get(token)
+                if token_id is None:
+                    token_id = len(self.tokens)
+                    self.tokens.append(sys.intern(token))
+                    self.ids[token] = token_id
+        return token_id
+    
+    def get(self, token):
+        """Return the id of a known token, or None"""
+        return self.ids.get(token)
+    
+    def decode(self, token_ids):
+        """Turn a sequence of token ids back into a space-separated string"""
+        tokens = self.tokens
+        return " ".join(tokens[token_id] for token_id in token_ids)
+    
+    def __len__(self):
+        return len(self.tokens)
+
+
+def edit_distance(source, target, limit):
+    """
+    Damerau-Levenshtein distance (adjacent transpositions count as one edit)
+    
+    Returns limit + 1 as soon as the distance is known to exceed limit.
+    """
+    if abs(len(source) - len(target)) > limit:
+        return limit + 1
+    previous_row = None
+    row = list(range(len(target) + 1))
+    for i, source_char in enumerate(source, 1):
+        previous_row, row = row, [i] + [0] * len(target)
+        for j, target_char in enumerate(target, 1):
+            cost = source_char != target_char
+            row[j] = min(previous_row[j] + 1, row[j - 1] + 1, previous_row[j - 1] + cost)
+            if (i > 1 and j > 1 and source_char == target[j - 2]
+                    and source[i - 2] == target_char):
+                row[j] = min(row[j], before_previous[j - 2] + 1)
+        if min(row) > limit:
+            return limit + 1
+        before_previous = previous_row
+    return row[-1]
+
+
+class FuzzyMatcher:
+    """
+    Maps misspelled tokens to the closest catalog keyword
+    
+    Keywords are indexed by positional character bigrams, bucketed by length.
+    An edit destroys at most three of a word's bigrams and shifts the others
+    by at most one position, so a keyword within distance k of a token shares
+    at least len(bigrams) - 3k of the token's bigrams at positions within k.
+    Only keywords passing that count filter are verified with edit_distance.
+    Every posting entry scanned and every distance computed counts against
+    the caller's budget.
+    """
+    
+    def __init__(self, vocabulary, keyword_ids, distance_limits=FUZZY_DISTANCE_LIMITS, cache_size=4096):
+        """
+        Parameters:
+            vocabulary (Vocabulary): Vocabulary the keyword ids belong to
+            keyword_ids (iterable): Ids of the keywords to match against
+            distance_limits (tuple): (minimum token length, edit distance) steps;
+                                     shorter tokens are never corrected
+            cache_size (int): Number of corrections to cache
+        """
+        self.vocabulary = vocabulary
+        self.distance_limits = tuple(sorted(distance_limits))
+        # (keyword length, position, bigram) -> keyword ids
+        self.grams = {}
+        for keyword_id in sorted(keyword_ids):
+            keyword = vocabulary.tokens[keyword_id]
+            for position, gram in enumerate(self.bigrams(keyword)):
+                self.grams.setdefault((len(keyword), position, gram), array('I')).append(keyword_id)
+        # token -> keyword id, or -1 when nothing is close enough
+        self.cache = LRUCache(cache_size)
+    
+    @staticmethod
+    def bigrams(token):
+        """Character bigrams of token padded with word boundaries, in order"""
+        padded = "\x00{}\x00".format(token)
+        return [padded[i:i + 2] for i in range(len(padded) - 1)]
+    
+    def max_distance(self, length):
+        """Edit distance allowed for a token of this length"""
+        distance = 0
+        for min_length, limit in self.distance_limits:
+            if length >= min_length:
+                distance = limit
+        return distance
+    
+    def correct(self, token, budget):
+        """
+        Find the catalog keyword closest to token
+        
+        The smallest edit distance wins, then the keyword seen first. Keywords
+        sharing no bigram with the token are never considered.
+        
+        Returns:
+            tuple: (keyword id or None, cost spent); the id is also None when the
+                   budget ran out, which is reported as a cost above budget
+        """
+        cached = self.cache.get(token)
+        if cached is not None:
+            return (cached if cached >= 0 else None), 0
+        
+        limit = self.max_distance(len(token))
+        if limit == 0:
+            return None, 0
+        
+        token_grams = self.bigrams(token)
+        grams = self.grams
+        selected = []
+        cost = 0
+        for length in range(max(1, len(token) - limit), len(token) + limit + 1):
+            for position, gram in enumerate(token_grams):
+                for shifted in range(max(0, position - limit), min(length, position + limit) + 1):
+                    postings = grams.get((length, shifted, gram))
+                    if postings is not None:
+                        selected.append(postings)
+                        cost += len(postings)
+                        if cost > budget:
+                            return None, cost
+        shared = Counter(itertools.chain.from_iterable(selected))
+        
+        # Verify candidates passing the count filter, most shared bigrams first,
+        # until the bigram bound shows no remaining keyword can be as close
+        required = max(1, len(token_grams) - 3 * limit)
+        candidates = sorted((-count, keyword_id) for keyword_id, count in shared.items() if count >= required)
+        best_id, best_distance = None, limit
+        tokens = self.vocabulary.tokens
+        for negative_count, keyword_id in candidates:
+            if -(-(len(token_grams) + negative_count) // 3) > best_distance:
+                break
+            cost += 1
+            if cost > budget:
+                return None, cost
+            distance = edit_distance(token, tokens[keyword_id], best_distance)
+            if distance < best_distance or (distance == best_distance and (best_id is None or keyword_id < best_id)):
+                best_id, best_distance = keyword_id, distance
+        
+        self.cache.put(token, best_id if best_id is not None else -1)
+        return best_id, cost
+
+
+class IntentRecord:
+    """
+    Compact record of one intent
+    
+    Supports intent["tag"]-style access so callers written against the JSON
+    dicts keep working; processed patterns are decoded from the model on demand.
+    """
+    
+    __slots__ = ('tag', 'patterns', 'responses', 'extra', 'index', 'model')
+    
+    # JSON keys stored as attributes; anything else goes to extra
+    FIELDS = ('tag', 'patterns', 'responses')
+    
+    def __init__(self, tag, patterns, responses, extra, index, model):
+        self.tag = tag
+        self.patterns = patterns
+        self.responses = responses
+        self.extra = extra
+        self.index = index
+        self.model = model
+    
+    def __getitem__(self, key):
+        if key in self.FIELDS:
+            return getattr(self, key)
+        if key == 'processed_patterns':
+            return self.model.processed_patterns(self.index)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+    
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+    
+    def __repr__(self):
+        return "IntentRecord(tag={!r}, patterns={})".format(self.tag, len(self.patterns))
+
+
+class IntentModel:
+    """
+    Preprocessed, read-only view of an intent catalog
+    
+    Holds the catalog together with every lookup structure derived from it,
+    so a chatbot can swap in a new catalog with a single assignment. The
+    layout is compact: tokens are interned to ids in a Vocabulary, processed
+    patterns are stored as one flat array of token ids with offsets, and
+    per-pattern data lives in parallel arrays indexed by pattern id (patterns
+    are numbered in catalog order).
+    """
+    
+    def __init__(self, vocabulary, content_hash):
+        self.vocabulary = vocabulary
+        self.content_hash = content_hash
+        self.intents = []
+        # Pattern ids of intent i are intent_offsets[i]:intent_offsets[i + 1]
+        self.intent_offsets = array('I', [0])
+        # Token ids of pattern p are pattern_tokens[pattern_offsets[p]:pattern_offsets[p + 1]]
+        self.pattern_offsets = array('I', [0])
+        self.pattern_tokens = array('I')
+        # Per pattern: owning intent and number of distinct keywords
+        self.pattern_intents = array('I')
+        self.keyword_counts = array('H')
+        # Inverted index: keyword id -> pattern ids, by keyword count then pattern id
+        self.keyword_index = {}
+        # Exact-match table: hashes of distinct token id sequences, sorted, with the
+        # first pattern id having each sequence (equal hashes are verified)
+        self.exact_hashes = array('q')
+        self.exact_patterns = array('I')
+        # Token id sequence (bytes) -> first pattern id, only while building
+        self._first_patterns = {}
+        # Processed patterns shared by several intents: processed pattern -> [tags]
+        self.pattern_collisions = {}
+        # Sparse keyword-incidence matrix for classify_batch, built on first use
+        self.batch_matrix = None
+        # FuzzyMatcher over the keywords, when the chatbot matches typos
+        self.fuzzy = None
+        # Patterns that went through NLTK when the model was built
+        self.preprocessed_patterns = 0
+        # False when intents were added without their original pattern strings
+        self.pattern_text_kept = True
+    
+    @property
+    def data(self):
+        """The catalog in the JSON layout ({"intents": [...]})"""
+        return {"intents": self.intents}
+    
+    def add_intent(self, intent, keep_pattern_text=True):
+        """
+        Append an intent (JSON dict or IntentRecord) and return its index
+        
+        Without keep_pattern_text only the processed patterns are kept.
+        """
+        if isinstance(intent, IntentRecord):
+            tag, patterns, responses, extra = intent.tag, intent.patterns, intent.responses, intent.extra
+        else:
+            tag = intent['tag']
+            patterns = tuple(intent['patterns'])
+            responses = tuple(intent['responses'])
+            extra = {
+                key: value for key, value in intent.items()
+                if key not in IntentRecord.FIELDS and key != 'processed_patterns'
+            } or None
+        if not keep_pattern_text:
+            patterns = ()
+            self.pattern_text_kept = False
+        
+        intent_idx = len(self.intents)
+        self.intents.append(IntentRecord(tag, patterns, responses, extra, intent_idx, self))
+        self.intent_offsets.append(self.intent_offsets[-1])
+        return intent_idx
+    
+    def add_pattern(self, processed, pattern_keywords):
+        """Append a processed pattern to the last intent and index it"""
+        intern = self.vocabulary.intern
+        intent_idx = len(self.intents) - 1
+        pattern_id = len(self.pattern_intents)
+        
+        token_ids = array('I', [intern(token) for token in processed.split()])
+        self.pattern_tokens.extend(token_ids)
+        self.pattern_offsets.append(len(self.pattern_tokens))
+        self.pattern_intents.append(intent_idx)
+        self.keyword_counts.append(len(pattern_keywords))
+        self.intent_offsets[-1] = pattern_id + 1
+        
+        owner_idx = self.pattern_intents[self._first_patterns.setdefault(token_ids.tobytes(), pattern_id)]
+        if owner_idx != intent_idx:
+            tags = self.pattern_collisions.setdefault(processed, [self.intents[owner_idx].tag])
+            tag = self.intents[intent_idx].tag
+            if tag not in tags:
+                tags.append(tag)
+        
+        # Index the pattern under each of its keywords
+        for keyword in pattern_keywords:
+            self.keyword_index.setdefault(intern(keyword), []).append(pattern_id)
+    
+    def finalize(self):
+        """
+        Freeze postings into arrays ordered by pattern keyword count
+        
+        Fewer keywords means a higher best possible score, so top-k retrieval
+        can visit candidates in decreasing upper-bound order.
+        """
+        keyword_counts = self.keyword_counts
+        for keyword_id, postings in self.keyword_index.items():
+            postings.sort(key=lambda pattern_id: (keyword_counts[pattern_id], pattern_id))
+            self.keyword_index[keyword_id] = array('I', postings)
+        self.build_exact_table(self._first_patterns.values())
+        self._first_patterns = {}
+    
+    def build_exact_table(self, pattern_ids):
+        """Build the sorted exact-match arrays for patterns with distinct token sequences"""
+        entries = sorted(
+            (hash(tuple(self.pattern_token_ids(pattern_id))), pattern_id) for pattern_id in pattern_ids
+        )
+        self.exact_hashes = array('q', [entry[0] for entry in entries])
+        self.exact_patterns = array('I', [entry[1] for entry in entries])
+    
+    def exact_intent(self, processed):
+        """Index of the intent owning this exact processed pattern, or None"""
+        token_ids = array('I')
+        for token in processed.split():
+            token_id = self.vocabulary.get(token)
+            if token_id is None:
+                return None
+            token_ids.append(token_id)
+        
+        # Tuple hashes of ints are stable across processes, unlike bytes hashes
+        key = hash(tuple(token_ids))
+        position = bisect.bisect_left(self.exact_hashes, key)
+        while position < len(self.exact_hashes) and self.exact_hashes[position] == key:
+            pattern_id = self.exact_patterns[position]
+            if self.pattern_token_ids(pattern_id) == token_ids:
+                return self.pattern_intents[pattern_id]
+            position += 1
+        return None
+    
+    def pattern_location(self, pattern_id):
+        """(intent index, pattern index within the intent) of a pattern id"""
+        intent_idx = self.pattern_intents[pattern_id]
+        return intent_idx, pattern_id - self.intent_offsets[intent_idx]
+    
+    def pattern_token_ids(self, pattern_id):
+        """Token ids of a processed pattern"""
+        return self.pattern_tokens[self.pattern_offsets[pattern_id]:self.pattern_offsets[pattern_id + 1]]
+    
+    def processed_pattern(self, pattern_id):
+        """Processed pattern string of a pattern id"""
+        return self.vocabulary.decode(self.pattern_token_ids(pattern_id))
+    
+    def pattern_text(self, pattern_id):
+        """Original text of a pattern, or its processed form if the text was discarded"""
+        intent_idx, pattern_idx = self.pattern_location(pattern_id)
+        patterns = self.intents[intent_idx].patterns
+        return patterns[pattern_idx] if patterns else self.processed_pattern(pattern_id)
+    
+    def processed_patterns(self, intent_idx):
+        """Processed pattern strings of one intent"""
+        return [
+            self.processed_pattern(pattern_id)
+            for pattern_id in range(self.intent_offsets[intent_idx], self.intent_offsets[intent_idx + 1])
+        ]
+    
+    def processed_by_pattern(self):
+        """Map each original pattern text to its processed form"""
+        return {
+            pattern: processed
+            for intent in self.intents
+            for pattern, processed in zip(intent.patterns, self.processed_patterns(intent.index))
+        }
+    
+    def estimated_size(self):
+        """Rough memory footprint of the model in bytes, excluding the (shareable) vocabulary"""
+        size = sys.getsizeof(self) + sys.getsizeof(self.intents)
+        for values in (self.intent_offsets, self.pattern_offsets, self.pattern_tokens, self.pattern_intents,
+                       self.keyword_counts, self.exact_hashes, self.exact_patterns):
+            size += sys.getsizeof(values)
+        size += sys.getsizeof(self.keyword_index)
+        size += sum(sys.getsizeof(postings) for postings in self.keyword_index.values())
+        for intent in self.intents:
+            size += sys.getsizeof(intent) + sys.getsizeof(intent.tag)
+            for texts in (intent.patterns, intent.responses):
+                size += sys.getsizeof(texts) + sum(sys.getsizeof(text) for text in texts)
+            if intent.extra:
+                size += sys.getsizeof(intent.extra)
+        if self.fuzzy is not None:
+            size += sys.getsizeof(self.fuzzy.grams)
+            size += sum(sys.getsizeof(postings) for postings in self.fuzzy.grams.values())
+        return size
+    
+    def to_state(self):
+        """
+        Plain picklable state for snapshots
+        
+        Only the tokens this model uses are stored, renumbered from 0, so a
+        snapshot stays small when the vocabulary is shared with other models
+        and loads without remapping into a fresh vocabulary.
+        """
+        used = sorted(set(self.pattern_tokens).union(self.keyword_index))
+        tokens = self.vocabulary.tokens
+        if used == list(range(len(used))) and len(used) == len(tokens):
+            pattern_tokens = self.pattern_tokens
+            keyword_index = self.keyword_index
+            exact_hashes, exact_patterns = self.exact_hashes, self.exact_patterns
+        else:
+            compact = {token_id: new_id for new_id, token_id in enumerate(used)}
+            pattern_tokens = array('I', [compact[token_id] for token_id in self.pattern_tokens])
+            keyword_index = {compact[keyword_id]: postings for keyword_id, postings in self.keyword_index.items()}
+            # Exact-match hashes are over token ids, so they change with the ids
+            entries = sorted(
+                (hash(tuple(pattern_tokens[self.pattern_offsets[pattern_id]:self.pattern_offsets[pattern_id + 1]])),
+                 pattern_id)
+                for pattern_id in self.exact_patterns
+            )
+            exact_hashes = array('q', [entry[0] for entry in entries])
+            exact_patterns = array('I', [entry[1] for entry in entries])
+        return {
+            "tokens": [tokens[token_id] for token_id in used],
+            "intents": [(intent.tag, intent.patterns, intent.responses, intent.extra) for intent in self.intents],
+            "intent_offsets": self.intent_offsets,
+            "pattern_offsets": self.pattern_offsets,
+            "pattern_tokens": pattern_tokens,
+            "pattern_intents": self.pattern_intents,
+            "keyword_counts": self.keyword_counts,
+            "keyword_index": keyword_index,
+            "exact_hashes": exact_hashes,
+            "exact_patterns": exact_patterns,
+            "pattern_collisions": self.pattern_collisions,
+            "pattern_text": self.pattern_text_kept,
+        }
+    
+    @classmethod
+    def from_state(cls, state, vocabulary, content_hash):
+        """Rebuild a model from to_state() output, mapping token ids into vocabulary"""
+        model = cls(vocabulary, content_hash)
+        for index, (tag, patterns, responses, extra) in enumerate(state["intents"]):
+            model.intents.append(IntentRecord(tag, patterns, responses, extra, index, model))
+        model.intent_offsets = state["intent_offsets"]
+        model.pattern_offsets = state["pattern_offsets"]
+        model.pattern_intents = state["pattern_intents"]
+        model.keyword_counts = state["keyword_counts"]
+        model.pattern_collisions = state["pattern_collisions"]
+        model.pattern_text_kept = state["pattern_text"]
+        
+        # Token ids differ when the vocabulary already holds other tokens
+        remap = [vocabulary.intern(token) for token in state["tokens"]]
+        if all(old_id == new_id for old_id, new_id in enumerate(remap)):
+            model.pattern_tokens = state["pattern_tokens"]
+            model.keyword_index = state["keyword_index"]
+            model.exact_hashes = state["exact_hashes"]
+            model.exact_patterns = state["exact_patterns"]
+        else:
+            model.pattern_tokens = array('I', [remap[token_id] for token_id in state["pattern_tokens"]])
+            model.keyword_index = {remap[keyword_id]: postings for keyword_id, postings in state["keyword_index"].items()}
+            model.build_exact_table(state["exact_patterns"])
+        return model
 
 
 class SimplePatternChatbot:
-    def __init__(self, data_file='customer_support_data.json'):
+    def __init__(self, data_file='customer_support_data.json', nltk_data_dir=None,
+                 snapshot_file=None, use_snapshot=True,
+                 lemma_cache_size=10000, preprocess_cache_size=1024,
+                 session_store=None, metrics=None, vocabulary=None, tokenizer='nltk',
+                 fuzzy=False, fuzzy_distance_limits=FUZZY_DISTANCE_LIMITS, fuzzy_budget=FUZZY_BUDGET,
+                 keep_pattern_text=True, trace_load_memory=False,
+                 lemmatizer=None, lemma_cache=None, preprocess_cache=None):
         """
         Initialize the chatbot with the specified data file
         
         Parameters:
             data_file (str): Path to the JSON file containing intents data
+            nltk_data_dir (str): Optional local NLTK data directory
+            snapshot_file (str): Precompiled snapshot of the preprocessed patterns
+                                 (defaults to data_file + '.snapshot')
+            use_snapshot (bool): Load the snapshot when it matches the data file
+            lemma_cache_size (int): Number of token lemmas to cache (0 disables)
+            preprocess_cache_size (int): Number of preprocessed texts to cache (0 disables)
+            session_store (SessionStore): Store for per-conversation state
+            metrics (PipelineMetrics): Record per-stage timings and counters
+                                       (None keeps instrumentation off)
+            vocabulary (Vocabulary): Token interning table, shareable between chatbots
+            tokenizer (str): 'nltk' (word_tokenize) or 'fast' (fast_word_tokenize)
+            fuzzy (bool): Map input keywords unknown to the catalog to the closest
+                          catalog keyword (typo tolerance)
+            fuzzy_distance_limits (tuple): (minimum token length, edit distance) steps
+            fuzzy_budget (int): Keyword comparisons allowed per query for fuzzy lookup
+            keep_pattern_text (bool): Keep the original pattern strings (top-k results
+                                      show processed patterns without them)
+            trace_load_memory (bool): Measure peak Python memory while loading the
+                                      catalog with tracemalloc (see load_stats)
+            lemmatizer (WordNetLemmatizer): Lemmatizer, shareable between chatbots
+            lemma_cache (LRUCache): Token -> lemma cache, shareable between chatbots
+                                    (overrides lemma_cache_size)
+            preprocess_cache (LRUCache): Text -> preprocessed text cache, shareable
+                                         between chatbots using the same tokenizer
+                                         (overrides preprocess_cache_size)
+        
+        The catalog file (JSON, or JSONL with one intent per line) is streamed
+        one intent at a time, so the parsed document is never held in memory.
+        The loaded intent data is read-only after construction, so one instance
+        can serve many concurrent conversations, each identified by a session id.
         """
-        # Load data
-        with open(data_file, 'r') as file:
-            self.data = json.load(file)
+        self.nltk_data_dir = nltk_data_dir
+        if tokenizer not in TOKENIZERS:
+            raise ValueError("Unknown tokenizer {!r}; expected one of {}".format(tokenizer, TOKENIZERS))
+        self.tokenizer = tokenizer
+        self.fuzzy = fuzzy
+        self.fuzzy_distance_limits = fuzzy_distance_limits
+        self.fuzzy_budget = fuzzy_budget
+        self.keep_pattern_text = keep_pattern_text
+        self.trace_load_memory = trace_load_memory
+        self.load_stats = None
+        
+        # Caches for the NLTK pipeline: token -> lemma and raw text -> preprocessed text
+        self.lemma_cache = lemma_cache if lemma_cache is not None else LRUCache(lemma_cache_size)
+        self.preprocess_cache = preprocess_cache if preprocess_cache is not None else LRUCache(preprocess_cache_size)
         
         # Initialize lemmatizer for word normalization
-        self.lemmatizer = WordNetLemmatizer()
+        self.lemmatizer = lemmatizer if lemmatizer is not None else WordNetLemmatizer()
+        self.vocabulary = vocabulary if vocabulary is not None else Vocabulary()
+        
+        # Catalog reloading and file watching
+        self._reload_lock = threading.Lock()
+        self._watch_stop = None
         
-        # Preprocess patterns for all intents
-        self.prepare_patterns()
+        # Load data, preprocessing patterns unless a matching snapshot exists
+        self.data_file = data_file
+        self.snapshot_file = snapshot_file or data_file + SNAPSHOT_SUFFIX
+        if not (use_snapshot and self.load_snapshot(self.snapshot_file, self.compute_file_hash(data_file))):
+            self.model = self.load_catalog(data_file)
         
         # Set fallback responses
         self.fallback_responses = [
@@ -35,24 +1187,306 @@ class SimplePatternChatbot:
             "I'm still learning. Could you try asking your question differently?"
         ]
         
-        # Track conversation context (for multi-turn conversations)
-        self.context = {
-            "current_intent": None,
-            "previous_intents": []
-        }
+        # Track conversation context per session (for multi-turn conversations)
+        self.sessions = session_store if session_store is not None else SessionStore()
+        
+        # Optional pipeline instrumentation
+        self.metrics = None
+        if metrics is not None:
+            self.enable_metrics(metrics)
+    
+    def enable_metrics(self, metrics=None):
+        """
+        Start recording per-stage timings and counters
+        
+        Returns:
+            PipelineMetrics: The metrics being recorded, for snapshots and export
+        """
+        metrics = metrics or PipelineMetrics()
+        metrics.add_collector(self._collect_metrics)
+        self.metrics = metrics
+        return metrics
+    
+    def disable_metrics(self):
+        """Stop recording metrics"""
+        if self.metrics is not None:
+            self.metrics.remove_collector(self._collect_metrics)
+        self.metrics = None
+    
+    def _collect_metrics(self, metrics):
+        # Refresh cache and session metrics before a snapshot or export;
+        # hit/miss/eviction totals only grow, so they are counters
+        for cache, stats in self.cache_stats().items():
+            metrics.set_gauge("cache_size", stats["size"], cache=cache)
+            for name in ("hits", "misses", "evictions"):
+                metrics.set_counter("cache_" + name, stats[name], cache=cache)
+        metrics.set_gauge("sessions", len(self.sessions))
+    
+    @property
+    def context(self):
+        """Conversation context of the default session"""
+        return self.sessions.get(DEFAULT_SESSION).context
+    
+    @context.setter
+    def context(self, context):
+        self.sessions.get(DEFAULT_SESSION).context = context
+    
+    # The loaded catalog and its lookup structures live on self.model
+    data = property(lambda self: self.model.data)
+    content_hash = property(lambda self: self.model.content_hash)
+    keyword_index = property(lambda self: self.model.keyword_index)
+    pattern_collisions = property(lambda self: self.model.pattern_collisions)
     
     def prepare_patterns(self):
         # Process all patterns for easier matching
+        self.model = self.load_catalog(self.data_file, self.model)
+    
+    def load_catalog(self, data_file, previous=None):
+        """
+        Stream a catalog file into a new IntentModel
+        
+        Intents are preprocessed and indexed as they are read; the content
+        hash is computed from the same bytes. Timing, sizes and memory use are
+        recorded in self.load_stats.
+        """
+        tracing = self.trace_load_memory and not tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.start()
+        start = time.perf_counter()
+        try:
+            digest = self.content_digest()
+            model = self.build_model(iter_intents(data_file, digest=digest), None, previous)
+            model.content_hash = digest.digest()
+            peak_traced = tracemalloc.get_traced_memory()[1] if tracing else None
+        finally:
+            if tracing:
+                tracemalloc.stop()
+        
+        self.load_stats = {
+            "intents": len(model.intents),
+            "patterns": len(model.pattern_intents),
+            "preprocessed_patterns": model.preprocessed_patterns,
+            "seconds": time.perf_counter() - start,
+            "peak_traced_bytes": peak_traced,
+            "max_rss_kb": _max_rss_kb(),
+        }
+        logger.info(
+            "Loaded %d intents (%d patterns) from %s in %.2fs, peak traced memory %s, max RSS %s KiB",
+            self.load_stats["intents"], self.load_stats["patterns"], data_file,
+            self.load_stats["seconds"], peak_traced, self.load_stats["max_rss_kb"]
+        )
+        return model
+    
+    def build_model(self, intents, content_hash, previous=None):
+        """
+        Preprocess and index intents (an iterable of JSON dicts) into a new IntentModel
+        
+        Patterns whose text already appears in the previous model reuse its
+        processed form, so only added or changed patterns go through NLTK.
+        """
+        model = IntentModel(self.vocabulary, content_hash)
+        reusable = previous.processed_by_pattern() if previous is not None else {}
+        preprocessed = 0
+        
         # Process each intent
-        for intent in self.data['intents']:
-            processed_patterns = []
+        for intent in intents:
+            model.add_intent(intent, self.keep_pattern_text)
             for pattern in intent['patterns']:
                 # Create processed versions of each pattern
-                processed = self.preprocess_text(pattern)
-                processed_patterns.append(processed)
+                processed = reusable.get(pattern)
+                if processed is None:
+                    processed = self.preprocess_text(pattern)
+                    preprocessed += 1
+                
+                pattern_keywords = set(self.keywords_from_processed(processed))
+                model.add_pattern(processed, pattern_keywords)
+        
+        model.finalize()
+        self.attach_fuzzy_matcher(model)
+        
+        for processed, tags in model.pattern_collisions.items():
+            logger.warning(
+                "Pattern %r belongs to several intents %s; using %r",
+                processed, tags, tags[0]
+            )
+        
+        model.preprocessed_patterns = preprocessed
+        return model
+    
+    def reload(self, data_file=None):
+        """
+        Reload the intent catalog without interrupting requests
+        
+        The new catalog is diffed against the loaded one, only added or changed
+        patterns are preprocessed, and the new model is swapped in atomically.
+        Requests in flight finish on the old model; session context is kept.
+        
+        Parameters:
+            data_file (str): Catalog to load (defaults to the current data file)
+        
+        Returns:
+            dict: Whether anything changed, the added/removed/changed intent
+                  tags and how many patterns had to be preprocessed
+        """
+        with self._reload_lock:
+            data_file = data_file or self.data_file
+            previous = self.model
+            if self.compute_file_hash(data_file) == previous.content_hash:
+                return {"changed": False, "added": [], "removed": [], "modified": [],
+                        "preprocessed_patterns": 0}
             
-            # Store processed patterns with the intent
-            intent['processed_patterns'] = processed_patterns
+            model = self.load_catalog(data_file, previous)
+            changes = self.diff_catalogs(previous.data, model.data)
+            
+            # Atomic swap: readers see either the old or the new model
+            self.model = model
+            self.data_file = data_file
+        
+        logger.info(
+            "Reloaded %s: %d added, %d removed, %d modified intents, %d patterns preprocessed",
+            data_file, len(changes["added"]), len(changes["removed"]),
+            len(changes["modified"]), model.preprocessed_patterns
+        )
+        return dict(changes, changed=True, preprocessed_patterns=model.preprocessed_patterns)
+    
+    @staticmethod
+    def diff_catalogs(old_data, new_data):
+        """Compare two catalogs intent by intent (by tag)"""
+        def comparable(intent):
+            if isinstance(intent, IntentRecord):
+                extra = intent.extra
+                if not intent.patterns:
+                    # Pattern text was discarded; compare the processed patterns
+                    return tuple(intent['processed_patterns']), tuple(intent['responses']), extra
+            else:
+                extra = {
+                    key: value for key, value in intent.items()
+                    if key not in IntentRecord.FIELDS and key != 'processed_patterns'
+                } or None
+            return tuple(intent['patterns']), tuple(intent['responses']), extra
+        
+        old_intents = {intent['tag']: comparable(intent) for intent in old_data['intents']}
+        new_intents = {intent['tag']: comparable(intent) for intent in new_data['intents']}
+        return {
+            "added": [tag for tag in new_intents if tag not in old_intents],
+            "removed": [tag for tag in old_intents if tag not in new_intents],
+            "modified": [
+                tag for tag, intent in new_intents.items()
+                if tag in old_intents and old_intents[tag] != intent
+            ],
+        }
+    
+    def watch(self, interval=2.0):
+        """
+        Reload the catalog automatically whenever its file changes
+        
+        Polls the data file's modification time and size from a daemon thread.
+        A failed reload (e.g. a half-written file) is logged and the current
+        catalog keeps serving until the next change.
+        """
+        if self._watch_stop is not None:
+            return
+        stop = self._watch_stop = threading.Event()
+        
+        def signature():
+            try:
+                stat = os.stat(self.data_file)
+            except OSError:
+                return None
+            return stat.st_mtime_ns, stat.st_size
+        
+        def poll(last_seen):
+            while not stop.wait(interval):
+                current = signature()
+                if current is None or current == last_seen:
+                    continue
+                last_seen = current
+                try:
+                    self.reload()
+                except Exception:
+                    logger.exception("Reloading %s failed; keeping the current catalog", self.data_file)
+        
+        threading.Thread(target=poll, args=(signature(),), name="catalog-watcher", daemon=True).start()
+    
+    def stop_watching(self):
+        """Stop the file watcher started by watch()"""
+        if self._watch_stop is not None:
+            self._watch_stop.set()
+            self._watch_stop = None
+    
+    def content_digest(self):
+        """SHA-256 seeded with everything besides the catalog bytes that shapes preprocessing"""
+        digest = hashlib.sha256()
+        digest.update("{}:{}:".format(SNAPSHOT_VERSION, nltk.__version__).encode())
+        return digest
+    
+    def compute_content_hash(self, raw_data):
+        """Key a snapshot by the source JSON and everything that shapes preprocessing"""
+        digest = self.content_digest()
+        digest.update(raw_data)
+        return digest.digest()
+    
+    def compute_file_hash(self, data_file, chunk_size=1 << 20):
+        """compute_content_hash of a file's contents, read in chunks"""
+        digest = self.content_digest()
+        with open(data_file, 'rb') as file:
+            for chunk in iter(lambda: file.read(chunk_size), b''):
+                digest.update(chunk)
+        return digest.digest()
+    
+    def save_snapshot(self, snapshot_file=None):
+        """Write the preprocessed patterns and lookup structures to a snapshot file"""
+        snapshot_file = snapshot_file or self.snapshot_file
+        model = self.model
+        state = model.to_state()
+        
+        # Write to a temporary file and rename so readers never see a partial snapshot
+        temp_file = "{}.{}.tmp".format(snapshot_file, os.getpid())
+        with open(temp_file, 'wb') as file:
+            file.write(SNAPSHOT_MAGIC)
+            file.write(model.content_hash)
+            pickle.dump(state, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, snapshot_file)
+        return snapshot_file
+    
+    def load_snapshot(self, snapshot_file, content_hash=None):
+        """
+        Load the catalog and its preprocessed patterns from a snapshot file
+        
+        The file is memory-mapped, so workers reading the same snapshot share
+        its pages through the OS page cache. Returns False if the snapshot is
+        missing, unreadable or was compiled from different data (content_hash,
+        defaulting to the loaded catalog's).
+        """
+        if content_hash is None:
+            content_hash = self.model.content_hash
+        try:
+            with open(snapshot_file, 'rb') as file, \
+                    mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as view:
+                if (view[:len(SNAPSHOT_MAGIC)] != SNAPSHOT_MAGIC
+                        or view[len(SNAPSHOT_MAGIC):SNAPSHOT_HEADER_SIZE] != content_hash):
+                    logger.info("Snapshot %s is stale, preprocessing patterns", snapshot_file)
+                    return False
+                
+                payload = memoryview(view)[SNAPSHOT_HEADER_SIZE:]
+                try:
+                    state = pickle.loads(payload)
+                finally:
+                    payload.release()
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError) as error:
+            logger.warning("Could not load snapshot %s: %s", snapshot_file, error)
+            return False
+        
+        if self.keep_pattern_text and not state["pattern_text"]:
+            logger.info("Snapshot %s was compiled without pattern text, preprocessing patterns", snapshot_file)
+            return False
+        
+        model = IntentModel.from_state(state, self.vocabulary, content_hash)
+        self.attach_fuzzy_matcher(model)
+        self.model = model
+        return True
     
     def preprocess_text(self, text):
         """
@@ -63,51 +1497,62 @@ class SimplePatternChatbot:
         4. Lemmatizing words
         5. Rejoining into a string
         """
+        cached = self.preprocess_cache.get(text)
+        if cached is not None:
+            return cached
+        
+        # Load NLTK data on first use
+        if not _nltk_ready:
+            ensure_nltk_resources(self.nltk_data_dir)
+        
         # Convert to lowercase
-        text = text.lower()
+        lowered = text.lower()
         
         # Tokenize
-        tokens = nltk.word_tokenize(text)
-        4
+        if self.tokenizer == 'fast':
+            tokens = fast_word_tokenize(lowered)
+        else:
+            tokens = nltk.word_tokenize(lowered)
+        
         # Remove punctuation and lemmatize
         processed_tokens = [
-            self.lemmatizer.lemmatize(token) 
+            self.lemmatize(token)
             for token in tokens 
             if token not in string.punctuation
         ]
         
         # Return as a string
-        return " ".join(processed_tokens)
+        processed = " ".join(processed_tokens)
+        self.preprocess_cache.put(text, processed)
+        return processed
+    
+    def lemmatize(self, token):
+        """Lemmatize a single token, consulting the lemma cache first"""
+        lemma = self.lemma_cache.get(token)
+        if lemma is None:
+            lemma = self.lemmatizer.lemmatize(token)
+            self.lemma_cache.put(token, lemma)
+        return lemma
+    
+    def cache_stats(self):
+        """Return hit/miss counters for the lemma and preprocessing caches"""
+        return {
+            "lemma": self.lemma_cache.stats(),
+            "preprocess": self.preprocess_cache.stats(),
+        }
     
     def extract_keywords(self, text):
         """Extract important keywords from text"""
         processed = self.preprocess_text(text)
-        
+        return self.keywords_from_processed(processed)
+    
+    def keywords_from_processed(self, processed):
+        """Extract important keywords from already preprocessed text"""
         # Split by spaces
         words = processed.split()
         
-        # Remove common words (simple approach)
-        stopwords = ["i", "me", "my", "myself", "we", "our", "ours", "ourselves", "you", 
-                     "your", "yours", "yourself", "yourselves", "he", "him", "his", 
-                     "himself", "she", "her", "hers", "herself", "it", "its", "itself", 
-                     "they", "them", "their", "theirs", "themselves", "what", "which", 
-                     "who", "whom", "this", "that", "these", "those", "am", "is", "are", 
-                     "was", "were", "be", "been", "being", "have", "has", "had", "having", 
-                     "do", "does", "did", "doing", "a", "an", "the", "and", "but", "if", 
-                     "or", "because", "as", "until", "while", "of", "at", "by", "for", 
-                     "with", "about", "against", "between", "into", "through", "during", 
-                     "before", "after", "above", "below", "to", "from", "up", "down", 
-                     "in", "out", "on", "off", "over", "under", "again", "further", 
-                     "then", "once", "here", "there", "when", "where", "why", "how", 
-                     "all", "any", "both", "each", "few", "more", "most", "other", 
-                     "some", "such", "no", "nor", "not", "only", "own", "same", "so", 
-                     "than", "too", "very", "s", "t", "can", "will", "just", "don", 
-                     "should", "now", "d", "ll", "m", "o", "re", "ve", "y", "ain", "aren", 
-                     "couldn", "didn", "doesn", "hadn", "hasn", "haven", "isn", "ma", 
-                     "mightn", "mustn", "needn", "shan", "shouldn", "wasn", "weren", 
-                     "won", "wouldn"]
-        
-        keywords = [word for word in words if word not in stopwords]
+        # Remove common words
+        keywords = [word for word in words if word not in STOPWORDS]
         return keywords
     
     def keyword_match(self, user_input, pattern):
@@ -135,119 +1580,583 @@ class SimplePatternChatbot:
     
     def find_intent(self, user_input):
         """Find the most likely intent for the user input"""
+        # Use one model for the whole lookup, even if a reload swaps it meanwhile
+        model = self.model
+        metrics = self.metrics
+        if metrics is not None:
+            started = time.perf_counter()
+        
         processed_input = self.preprocess_text(user_input)
         
+        if metrics is not None:
+            preprocessed = time.perf_counter()
+            metrics.observe("preprocess", preprocessed - started)
+        
         # First check for exact matches
-        for intent in self.data['intents']:
-            for i, pattern in enumerate(intent['processed_patterns']):
-                if self.exact_match(processed_input, pattern):
-                    return intent, 1.0  # Perfect confidence
+        intent_idx = model.exact_intent(processed_input)
+        
+        if metrics is not None:
+            exact_checked = time.perf_counter()
+            metrics.observe("exact_match", exact_checked - preprocessed)
+        
+        if intent_idx is not None:
+            if metrics is not None:
+                metrics.increment("intent_matches", outcome="exact")
+            return model.intents[intent_idx], 1.0  # Perfect confidence
         
         # If no exact match, use keyword matching
         best_intent = None
-        best_score = 0.3  # Threshold for minimum match quality
+        best_score = MATCH_THRESHOLD  # Threshold for minimum match quality
         
-        for intent in self.data['intents']:
-            for i, pattern in enumerate(intent['processed_patterns']):
-                # Check original pattern too for more context
-                original_pattern = intent['patterns'][i]
-                score = self.keyword_match(user_input, original_pattern)
-                
-                if score > best_score:
-                    best_score = score
-                    best_intent = intent
+        # Only patterns sharing at least one keyword with the input can score
+        match_counts = {}
+        for keyword_id in self.keyword_ids(processed_input, model):
+            for pattern_id in model.keyword_index[keyword_id]:
+                match_counts[pattern_id] = match_counts.get(pattern_id, 0) + 1
+        
+        # On equal scores keep the earliest pattern in catalog order, like a full scan
+        best_key = None
+        keyword_counts = model.keyword_counts
+        for pattern_id, matches in match_counts.items():
+            score = matches / keyword_counts[pattern_id]
+            if score > best_score or (score == best_score and best_key is not None and pattern_id < best_key):
+                best_score = score
+                best_key = pattern_id
+        
+        if best_key is not None:
+            best_intent = model.intents[model.pattern_intents[best_key]]
+        
+        if metrics is not None:
+            metrics.observe("keyword_scoring", time.perf_counter() - exact_checked)
+            metrics.increment("patterns_scored", len(match_counts))
+            metrics.increment("intent_matches", outcome="keyword" if best_key is not None else "fallback")
         
         return best_intent, best_score
     
-    def context_aware_response(self, user_input):
-        """Generate a response considering conversation context"""
+    def find_top_intents(self, user_input, k=3):
+        """
+        Return the k best-scoring (intent, pattern, score) candidates
+        
+        Scores are the same keyword scores find_intent uses, best first, with
+        ties in catalog order. A pattern with c keywords can score at most
+        min(n, c) / c for n matchable input keywords, and postings are sorted by
+        c, so candidates are visited in decreasing upper-bound order and the
+        scan stops once no remaining pattern can enter the top k.
+        """
+        model = self.model
+        processed_input = self.preprocess_text(user_input)
+        user_keywords = self.keyword_ids(processed_input, model)
+        postings = [model.keyword_index[keyword_id] for keyword_id in user_keywords]
+        if not postings or k <= 0:
+            return []
+        
+        # Min-heap of the current top k; the root is the weakest candidate
+        top = []
+        seen = set()
+        matchable = len(postings)
+        keyword_counts = model.keyword_counts
+        for pattern_id in heapq.merge(*postings, key=lambda pattern_id: (keyword_counts[pattern_id], pattern_id)):
+            keyword_count = keyword_counts[pattern_id]
+            upper_bound = min(matchable, keyword_count) / keyword_count
+            if len(top) == k and upper_bound < top[0][0]:
+                break
+            
+            if pattern_id in seen:
+                continue
+            seen.add(pattern_id)
+            
+            matches = len(user_keywords.intersection(model.pattern_token_ids(pattern_id)))
+            # Higher score wins, then the earlier pattern in catalog order
+            candidate = (matches / keyword_count, -pattern_id)
+            if len(top) < k:
+                heapq.heappush(top, candidate)
+            elif candidate > top[0]:
+                heapq.heapreplace(top, candidate)
+        
+        results = []
+        for score, pattern_id in sorted(top, reverse=True):
+            intent = model.intents[model.pattern_intents[-pattern_id]]
+            results.append((intent, model.pattern_text(-pattern_id), score))
+        return results
+    
+    def keyword_ids(self, processed, model=None):
+        """
+        Ids of the keywords of a processed string that occur in the keyword index
+        
+        With fuzzy matching on, keywords missing from the index are replaced by
+        the closest catalog keyword, until the per-query budget is spent.
+        """
+        model = model or self.model
+        get_id = model.vocabulary.get
+        keyword_index = model.keyword_index
+        keyword_ids = set()
+        unknown = []
+        for keyword in self.keywords_from_processed(processed):
+            keyword_id = get_id(keyword)
+            if keyword_id is not None and keyword_id in keyword_index:
+                keyword_ids.add(keyword_id)
+            else:
+                unknown.append(keyword)
+        
+        if unknown and model.fuzzy is not None:
+            budget = self.fuzzy_budget
+            corrected = 0
+            for keyword in unknown:
+                keyword_id, cost = model.fuzzy.correct(keyword, budget)
+                budget -= cost
+                if budget < 0:
+                    if self.metrics is not None:
+                        self.metrics.increment("fuzzy_budget_exhausted")
+                    break
+                if keyword_id is not None:
+                    keyword_ids.add(keyword_id)
+                    corrected += 1
+            if corrected and self.metrics is not None:
+                self.metrics.increment("fuzzy_corrections", corrected)
+        return keyword_ids
+    
+    def attach_fuzzy_matcher(self, model):
+        """Index the model's keywords for typo-tolerant lookup, if fuzzy matching is on"""
+        if self.fuzzy:
+            model.fuzzy = FuzzyMatcher(model.vocabulary, model.keyword_index, self.fuzzy_distance_limits)
+    
+    def build_batch_matrix(self, model):
+        """
+        Build the sparse pattern/keyword incidence matrix used by classify_batch
+        
+        The matrix is stored column-wise (CSC): the patterns containing keyword
+        column c are rows[indptr[c]:indptr[c + 1]]. Rows are pattern ids, i.e.
+        catalog order, so the lowest row wins ties, like find_intent.
+        """
+        columns = {}
+        indptr = [0]
+        rows = array('I')
+        for keyword_id, postings in model.keyword_index.items():
+            columns[keyword_id] = len(columns)
+            rows.extend(postings)
+            indptr.append(len(rows))
+        
+        return {
+            "columns": columns,
+            "indptr": np.asarray(indptr, dtype=np.int64),
+            "rows": np.asarray(rows, dtype=np.int64),
+            "keyword_counts": np.asarray(model.keyword_counts, dtype=np.int64),
+            "row_intents": np.asarray(model.pattern_intents, dtype=np.int64),
+        }
+    
+    def classify_batch(self, texts, chunk_size=4096):
+        """
+        Classify many texts at once
+        
+        Gives the same results as find_intent, including the exact-match
+        short-circuit and the match threshold, but scores each chunk of texts
+        against all patterns with NumPy instead of per-message Python loops.
+        
+        Parameters:
+            texts (iterable): User messages, consumed one chunk at a time
+            chunk_size (int): Number of texts scored together
+        
+        Returns:
+            list: (intent tag or None, score) for each text
+        """
+        if np is None:
+            raise ImportError("classify_batch requires NumPy (pip install numpy)")
+        
+        model = self.model
+        if model.batch_matrix is None:
+            model.batch_matrix = self.build_batch_matrix(model)
+        
+        # Read the input a chunk at a time, so generators are never materialized
+        texts = iter(texts)
+        results = []
+        for chunk in iter(lambda: list(itertools.islice(texts, chunk_size)), []):
+            results.extend(self._classify_chunk(chunk, model))
+        return results
+    
+    def _classify_chunk(self, texts, model):
+        """Score one chunk of texts against the incidence matrix"""
+        intents = model.intents
+        matrix = model.batch_matrix
+        results = [(None, MATCH_THRESHOLD)] * len(texts)
+        
+        # Exact matches short-circuit; the rest become (query, keyword column) pairs
+        query_ids = []
+        column_ids = []
+        for query, text in enumerate(texts):
+            processed = self.preprocess_text(text)
+            intent_idx = model.exact_intent(processed)
+            if intent_idx is not None:
+                results[query] = (intents[intent_idx].tag, 1.0)
+                continue
+            
+            for keyword_id in self.keyword_ids(processed, model):
+                query_ids.append(query)
+                column_ids.append(matrix["columns"][keyword_id])
+        
+        if not query_ids:
+            return results
+        
+        # Expand every (query, keyword) pair into the patterns containing that keyword
+        query_ids = np.asarray(query_ids, dtype=np.int64)
+        column_ids = np.asarray(column_ids, dtype=np.int64)
+        starts = matrix["indptr"][column_ids]
+        lengths = matrix["indptr"][column_ids + 1] - starts
+        offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        pattern_rows = matrix["rows"][np.repeat(starts, lengths) + offsets]
+        
+        # Count shared keywords per (query, pattern), i.e. the sparse product Q x P^T
+        n_patterns = len(matrix["keyword_counts"])
+        pairs, matches = np.unique(np.repeat(query_ids, lengths) * n_patterns + pattern_rows,
+                                   return_counts=True)
+        pair_queries = pairs // n_patterns
+        pair_rows = pairs % n_patterns
+        scores = matches / matrix["keyword_counts"][pair_rows]
+        
+        # Best pattern per query above the threshold, earliest pattern on ties
+        above = scores > MATCH_THRESHOLD
+        pair_queries, pair_rows, scores = pair_queries[above], pair_rows[above], scores[above]
+        order = np.lexsort((pair_rows, -scores, pair_queries))
+        pair_queries, pair_rows, scores = pair_queries[order], pair_rows[order], scores[order]
+        first = np.ones(len(pair_queries), dtype=bool)
+        first[1:] = pair_queries[1:] != pair_queries[:-1]
+        
+        for query, row, score in zip(pair_queries[first].tolist(), pair_rows[first].tolist(),
+                                     scores[first].tolist()):
+            results[query] = (intents[matrix["row_intents"][row]].tag, score)
+        return results
+    
+    def context_aware_response(self, user_input, session_id=None, session=None):
+        """
+        Generate a response considering conversation context
+        
+        Pass the ConversationSession of session_id as session when the caller
+        already holds it.
+        """
+        session_id = session_id or DEFAULT_SESSION
+        if session is None:
+            session = self.sessions.get(session_id)
+        context = session.context
+        
         # Find the intent
         intent, confidence = self.find_intent(user_input)
         
+        metrics = self.metrics
+        if metrics is not None:
+            started = time.perf_counter()
+        
         # If we found a matching intent
         if intent is not None:
             # Update context
-            if self.context["current_intent"]:
-                self.context["previous_intents"].append(self.context["current_intent"])
+            if context["current_intent"]:
+                context["previous_intents"].append(context["current_intent"])
                 # Keep only last 3 intents
-                if len(self.context["previous_intents"]) > 3:
-                    self.context["previous_intents"].pop(0)
+                if len(context["previous_intents"]) > 3:
+                    context["previous_intents"].pop(0)
             
-            self.context["current_intent"] = intent["tag"]
+            context["current_intent"] = intent["tag"]
             
             # Generate response from the matched intent
-            return random.choice(intent["responses"])
+            response = random.choice(intent["responses"])
         else:
             # No intent matched
-            return random.choice(self.fallback_responses)
+            response = random.choice(self.fallback_responses)
+        
+        if metrics is not None:
+            metrics.observe("response_selection", time.perf_counter() - started)
+        
+        # The context (and any entities added by the caller) grew after get()
+        self.sessions.update_size(session_id, session)
+        return response
     
-    def get_response(self, user_input):
-        """Generate a response to user input"""
-        return self.context_aware_response(user_input)
+    def get_response(self, user_input, session_id=None):
+        """Generate a response to user input within a conversation session"""
+        return self.context_aware_response(user_input, session_id)
     
-    def reset_context(self):
+    def reset_context(self, session_id=None):
         """Reset the conversation context"""
-        self.context = {
+        self.sessions.get(session_id or DEFAULT_SESSION).context = {
             "current_intent": None,
             "previous_intents": []
         }
 
 # Enhanced version with entity extraction
 class EntityAwareChatbot(SimplePatternChatbot):
-    def __init__(self, data_file='customer_support_data.json'):
-        super().__init__(data_file)
-        # Define entity patterns
-        self.entity_patterns = {
-            'order_number': r'order\s+(?:number|#)?\s*(\w{6,12})',
-            'email': r'[\w\.-]+@[\w\.-]+\.\w+',
-            'product_code': r'product\s+(?:code|#)?\s*(\w{3,10})',
-            'date': r'(\d{1,2})[\/\-](\d{1,2})(?:[\/\-](\d{2,4}))?'
-        }
-        
-        # Store extracted entities
-        self.entities = {}
+    def __init__(self, data_file='customer_support_data.json', entity_scanner=None, **kwargs):
+        super().__init__(data_file, **kwargs)
+        # Compile entity patterns once; stop at the first match per type
+        self.entity_scanner = entity_scanner or EntityScanner(ENTITY_PATTERNS)
+    
+    @property
+    def entity_patterns(self):
+        """Registered entity patterns (use register_entity to add more)"""
+        return self.entity_scanner.patterns
     
-    def extract_entities(self, text):
+    def register_entity(self, entity_type, pattern):
+        """Recognize a new entity type from now on"""
+        self.entity_scanner.register(entity_type, pattern)
+    
+    @property
+    def entities(self):
+        """Entities extracted so far in the default session"""
+        return self.sessions.get(DEFAULT_SESSION).entities
+    
+    @entities.setter
+    def entities(self, entities):
+        self.sessions.get(DEFAULT_SESSION).entities = entities
+    
+    def extract_entities(self, text, session_id=None, session=None):
         """Extract entities from text based on patterns"""
-        found_entities = {}
-        
-        # Check each entity pattern
-        for entity_type, pattern in self.entity_patterns.items():
-            matches = re.findall(pattern, text, re.IGNORECASE)
-            if matches:
-                # Store the first matched entity of each type
-                if isinstance(matches[0], tuple):
-                    # For patterns with multiple capture groups
-                    found_entities[entity_type] = matches[0]
-                else:
-                    found_entities[entity_type] = matches[0]
+        # First matched entity of each type
+        found_entities = self.entity_scanner.scan(text)
         
-        # Update stored entities
-        self.entities.update(found_entities)
+        # Update stored entities; a caller passing the session re-measures it
+        if session is None:
+            session_id = session_id or DEFAULT_SESSION
+            session = self.sessions.get(session_id)
+            session.entities.update(found_entities)
+            self.sessions.update_size(session_id, session)
+        else:
+            session.entities.update(found_entities)
         return found_entities
     
-    def get_response(self, user_input):
+    def get_response(self, user_input, session_id=None):
         """Generate a response with entity recognition"""
+        metrics = self.metrics
+        if metrics is not None:
+            started = time.perf_counter()
+        
+        # One lookup per request, so the session cannot be evicted and
+        # recreated between updating its entities and its context
+        session = self.sessions.get(session_id or DEFAULT_SESSION)
+        
         # Extract entities first
-        entities = self.extract_entities(user_input)
+        entities = self.extract_entities(user_input, session=session)
+        
+        if metrics is not None:
+            metrics.observe("entity_extraction", time.perf_counter() - started)
         
         # Get base response
-        response = super().get_response(user_input)
+        response = self.context_aware_response(user_input, session_id, session=session)
+        context = session.context
         
         # Enhance response with entity information if appropriate
-        if entities and self.context["current_intent"]:
+        if entities and context["current_intent"]:
             # Add entity-specific information to responses
-            if 'order_number' in entities and self.context["current_intent"] == "order_status":
+            if 'order_number' in entities and context["current_intent"] == "order_status":
                 response += f" I've located your order #{entities['order_number']}. "
             
-            elif 'email' in entities and self.context["current_intent"] == "returns":
+            elif 'email' in entities and context["current_intent"] == "returns":
                 response += f" I'll send instructions to {entities['email']}. "
             
-            elif 'product_code' in entities and self.context["current_intent"] == "product_info":
+            elif 'product_code' in entities and context["current_intent"] == "product_info":
                 response += f" I've found details for product {entities['product_code']}. "
         
         return response
 
+class CatalogRegistry:
+    """
+    Thread-safe registry of per-tenant chatbots loaded on demand
+    
+    Every tenant (brand) has its own intent catalog. Chatbots are created on
+    first use and share the lemmatizer and its caches, the token Vocabulary,
+    the compiled entity patterns and the session store, so a tenant costs
+    little more than its IntentModel. When the models' estimated size exceeds
+    memory_budget, or more than max_catalogs are loaded, the least recently
+    used tenants are evicted; they are loaded again (from their snapshot, when
+    it is current) on their next request. Session ids are prefixed with the
+    tenant id, so conversations survive the eviction of their catalog.
+    
+    The vocabulary only grows: tokens of evicted catalogs stay interned, and
+    reloading a catalog reuses them.
+    """
+    
+    def __init__(self, catalogs, chatbot_class=None, memory_budget=None, max_catalogs=None,
+                 entity_patterns=None, session_store=None, save_snapshots=False, **chatbot_options):
+        """
+        Parameters:
+            catalogs: Tenant id -> catalog file, as a mapping or a callable
+                      (unknown tenants raise KeyError)
+            chatbot_class (type): Chatbot created per tenant (default: EntityAwareChatbot)
+            memory_budget (int): Approximate bytes for all loaded models (None disables)
+            max_catalogs (int): Maximum number of loaded catalogs (None disables)
+            entity_patterns (dict): Entity type -> regular expression (default: ENTITY_PATTERNS)
+            session_store (SessionStore): Store shared by all tenants' conversations
+            save_snapshots (bool): Write a snapshot after preprocessing a catalog, so
+                                   it loads quickly again after being evicted
+            **chatbot_options: Other chatbot_class arguments, the same for every tenant
+        """
+        self.catalogs = catalogs
+        self.chatbot_class = chatbot_class or EntityAwareChatbot
+        self.memory_budget = memory_budget
+        self.max_catalogs = max_catalogs
+        self.save_snapshots = save_snapshots
+        self.chatbot_options = chatbot_options
+        
+        # Shared by every tenant's chatbot
+        self.vocabulary = Vocabulary()
+        self.lemmatizer = WordNetLemmatizer()
+        self.lemma_cache = LRUCache(chatbot_options.pop('lemma_cache_size', 10000))
+        self.preprocess_cache = LRUCache(chatbot_options.pop('preprocess_cache_size', 1024))
+        self.entity_scanner = EntityScanner(ENTITY_PATTERNS if entity_patterns is None else entity_patterns)
+        self.sessions = session_store if session_store is not None else SessionStore()
+        
+        self.loads = 0
+        self.hits = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+        self._chatbots = OrderedDict()
+        self._sizes = {}
+        self._total_bytes = 0
+        self._loading = {}
+        self._lock = threading.Lock()
+    
+    def catalog_file(self, tenant_id):
+        """Catalog file of a tenant"""
+        if callable(self.catalogs):
+            return self.catalogs(tenant_id)
+        return self.catalogs[tenant_id]
+    
+    def get(self, tenant_id):
+        """Return the tenant's chatbot, loading its catalog if needed"""
+        with self._lock:
+            chatbot = self._lookup(tenant_id)
+            if chatbot is not None:
+                return chatbot
+            # [lock, threads holding or waiting for it]; the entry stays until
+            # the last of them leaves, so everyone loading a tenant uses one lock
+            loading = self._loading.get(tenant_id)
+            if loading is None:
+                loading = self._loading[tenant_id] = [threading.Lock(), 0]
+            loading[1] += 1
+        
+        # One thread loads a tenant while other requests for it wait; requests
+        # for loaded tenants are not held up by the load. If the load fails,
+        # the next waiter retries it under the same lock.
+        try:
+            with loading[0]:
+                with self._lock:
+                    chatbot = self._lookup(tenant_id)
+                    if chatbot is not None:
+                        return chatbot
+                
+                start = time.perf_counter()
+                chatbot = self._create(tenant_id)
+                seconds = time.perf_counter() - start
+                size = chatbot.model.estimated_size()
+                
+                with self._lock:
+                    self._chatbots[tenant_id] = chatbot
+                    self._sizes[tenant_id] = size
+                    self._total_bytes += size
+                    self.loads += 1
+                    self.load_seconds += seconds
+                    self._evict()
+        finally:
+            with self._lock:
+                loading[1] -= 1
+                if not loading[1]:
+                    del self._loading[tenant_id]
+        
+        logger.info("Loaded catalog for tenant %r in %.2fs (~%d bytes)", tenant_id, seconds, size)
+        return chatbot
+    
+    def get_response(self, tenant_id, user_input, session_id=None):
+        """Respond to user input in a tenant's conversation session"""
+        chatbot = self.get(tenant_id)
+        return chatbot.get_response(user_input, "{}:{}".format(tenant_id, session_id or DEFAULT_SESSION))
+    
+    def reload(self, tenant_id):
+        """Reload a loaded tenant's catalog from disk (see SimplePatternChatbot.reload)"""
+        with self._lock:
+            chatbot = self._chatbots.get(tenant_id)
+        if chatbot is None:
+            return None
+        changes = chatbot.reload()
+        if changes["changed"]:
+            with self._lock:
+                if self._chatbots.get(tenant_id) is chatbot:
+                    size = chatbot.model.estimated_size()
+                    self._total_bytes += size - self._sizes[tenant_id]
+                    self._sizes[tenant_id] = size
+                    self._evict()
+        return changes
+    
+    def evict(self, tenant_id):
+        """Unload a tenant's catalog; returns whether it was loaded"""
+        with self._lock:
+            if tenant_id not in self._chatbots:
+                return False
+            self._remove(tenant_id)
+            self.evictions += 1
+            return True
+    
+    def stats(self):
+        """Return loaded catalogs, their estimated memory and load/eviction counters"""
+        with self._lock:
+            return {
+                "tenants": list(self._chatbots),
+                "loaded": len(self._chatbots),
+                "estimated_bytes": self._total_bytes,
+                "memory_budget": self.memory_budget,
+                "loads": self.loads,
+                "hits": self.hits,
+                "evictions": self.evictions,
+                "load_seconds": self.load_seconds,
+                "vocabulary_tokens": len(self.vocabulary),
+                "sessions": len(self.sessions),
+            }
+    
+    def __len__(self):
+        return len(self._chatbots)
+    
+    def __contains__(self, tenant_id):
+        return tenant_id in self._chatbots
+    
+    def _lookup(self, tenant_id):
+        chatbot = self._chatbots.get(tenant_id)
+        if chatbot is not None:
+            self._chatbots.move_to_end(tenant_id)
+            self.hits += 1
+        return chatbot
+    
+    def _create(self, tenant_id):
+        options = dict(
+            self.chatbot_options,
+            vocabulary=self.vocabulary,
+            lemmatizer=self.lemmatizer,
+            lemma_cache=self.lemma_cache,
+            preprocess_cache=self.preprocess_cache,
+            session_store=self.sessions,
+        )
+        if issubclass(self.chatbot_class, EntityAwareChatbot):
+            options['entity_scanner'] = self.entity_scanner
+        chatbot = self.chatbot_class(self.catalog_file(tenant_id), **options)
+        # load_stats is only set when the catalog was preprocessed rather than
+        # loaded from its snapshot
+        if self.save_snapshots and chatbot.load_stats is not None:
+            try:
+                chatbot.save_snapshot()
+            except OSError as error:
+                logger.warning("Could not save snapshot for tenant %r: %s", tenant_id, error)
+        return chatbot
+    
+    def _remove(self, tenant_id):
+        chatbot = self._chatbots.pop(tenant_id)
+        self._total_bytes -= self._sizes.pop(tenant_id)
+        # Shared metrics must not keep the evicted chatbot alive
+        chatbot.disable_metrics()
+    
+    def _evict(self):
+        # Least recently used first; the tenant just used is always kept
+        while len(self._chatbots) > 1:
+            if not ((self.max_catalogs is not None and len(self._chatbots) > self.max_catalogs)
+                    or (self.memory_budget is not None and self._total_bytes > self.memory_budget)):
+                break
+            tenant_id = next(iter(self._chatbots))
+            self._remove(tenant_id)
+            self.evictions += 1
+            logger.info("Evicted catalog for tenant %r", tenant_id)
+
 # Sample JSON data structure (save as customer_support_data.json)
 sample_data = {
     "intents": [
@@ -383,8 +2292,166 @@ sample_data = {
     ]
 }
 
+def compile_snapshot(data_file='customer_support_data.json', snapshot_file=None):
+    """Preprocess a data file once and write its snapshot for fast warm starts"""
+    chatbot = SimplePatternChatbot(data_file, snapshot_file=snapshot_file, use_snapshot=False)
+    return chatbot.save_snapshot()
+
+# Chatbot built once per bulk-classification worker process, or the error
+# that prevented building it
+_bulk_chatbot = None
+_bulk_error = None
+
+
+def _init_bulk_worker(data_file, tokenizer='nltk'):
+    """Pool initializer: load the model once per worker"""
+    global _bulk_chatbot, _bulk_error
+    # An initializer that raises makes the pool respawn workers forever, so the
+    # error is kept and raised by the first task instead
+    try:
+        _bulk_chatbot = EntityAwareChatbot(data_file, tokenizer=tokenizer)
+    except Exception as error:
+        _bulk_error = error
+
+
+def _classify_messages(messages):
+    """Classify a chunk of (line number, text) pairs in a worker"""
+    if _bulk_error is not None:
+        raise _bulk_error
+    results = []
+    for line_no, text in messages:
+        intent, score = _bulk_chatbot.find_intent(text)
+        results.append({
+            "line": line_no,
+            "text": text,
+            "intent": intent["tag"] if intent is not None else None,
+            "score": score,
+            "entities": _bulk_chatbot.entity_scanner.scan(text),
+        })
+    return results
+
+
+def iter_messages(input_file, input_format=None):
+    """
+    Stream (line number, message) pairs from a chat-log file
+    
+    JSONL lines may be a JSON string or an object with a "text" or "message"
+    field; plain text files hold one message per line.
+    """
+    if input_format is None:
+        input_format = 'jsonl' if input_file.endswith(('.jsonl', '.ndjson')) else 'text'
+    
+    with open(input_file, 'r', encoding='utf-8') as file:
+        for line_no, line in enumerate(file, 1):
+            line = line.rstrip('\r\n')
+            if input_format == 'text':
+                yield line_no, line
+                continue
+            
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if isinstance(record, dict):
+                record = record.get('text', record.get('message', ''))
+            yield line_no, str(record)
+
+
+def bulk_classify(input_file, output_file, data_file='customer_support_data.json',
+                  workers=None, chunk_size=1000, input_format=None, tokenizer='nltk'):
+    """
+    Classify a large chat-log file with a process pool
+    
+    Messages are streamed in chunks and at most two chunks per worker are in
+    flight, so memory stays constant regardless of file size. Results are
+    written as JSONL in input order as soon as each chunk completes.
+    
+    The model is checked in this process first (and its snapshot compiled if
+    it is stale), so missing NLTK data or a bad data file fails before any
+    worker starts and workers load the snapshot instead of preprocessing.
+    
+    Returns:
+        dict: Message count, elapsed seconds and messages per second
+    
+    Raises:
+        LookupError: If the NLTK data is missing and cannot be downloaded
+        OSError, ValueError: If the data file cannot be read or parsed
+    """
+    import multiprocessing
+    
+    ensure_nltk_resources()
+    chatbot = SimplePatternChatbot(data_file, tokenizer=tokenizer)
+    if chatbot.load_stats is not None:
+        # Preprocessed here rather than loaded from a snapshot
+        try:
+            chatbot.save_snapshot()
+        except OSError as error:
+            logger.warning("Could not save snapshot for the workers: %s", error)
+    del chatbot
+    
+    workers = workers or os.cpu_count() or 1
+    messages = iter_messages(input_file, input_format)
+    chunks = iter(lambda: list(itertools.islice(messages, chunk_size)), [])
+    
+    start = time.perf_counter()
+    count = 0
+    output = sys.stdout if output_file == '-' else open(output_file, 'w', encoding='utf-8')
+    try:
+        with multiprocessing.Pool(workers, _init_bulk_worker, (data_file, tokenizer)) as pool:
+            pending = deque()
+            for chunk in itertools.chain(chunks, [None]):
+                if chunk is not None:
+                    pending.append(pool.apply_async(_classify_messages, (chunk,)))
+                
+                # Write finished chunks in order; block only when the window is full
+                while pending and (chunk is None or len(pending) >= 2 * workers or pending[0].ready()):
+                    for result in pending.popleft().get():
+                        output.write(json.dumps(result) + "\n")
+                        count += 1
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    
+    elapsed = time.perf_counter() - start
+    return {
+        "messages": count,
+        "seconds": elapsed,
+        "messages_per_second": count / elapsed if elapsed else 0.0,
+    }
+
 # Example usage
 if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Customer support chatbot")
+    parser.add_argument('--data-file', default='customer_support_data.json')
+    parser.add_argument('--compile', action='store_true',
+                        help="Write the precompiled snapshot for the data file and exit")
+    parser.add_argument('--classify', metavar='INPUT',
+                        help="Classify every message of a JSONL or text chat log and exit")
+    parser.add_argument('--output', default='-', help="Where --classify writes JSONL results")
+    parser.add_argument('--format', choices=['jsonl', 'text'],
+                        help="Input format for --classify (default: from the file extension)")
+    parser.add_argument('--workers', type=int, help="Worker processes for --classify")
+    parser.add_argument('--chunk-size', type=int, default=1000,
+                        help="Messages per worker task for --classify")
+    parser.add_argument('--tokenizer', choices=TOKENIZERS, default='nltk',
+                        help="Tokenizer for --classify (fast gives the same tokens without NLTK overhead)")
+    args = parser.parse_args()
+    
+    if args.compile:
+        print(f"Snapshot written to {compile_snapshot(args.data_file)}")
+        raise SystemExit(0)
+    
+    if args.classify:
+        try:
+            stats = bulk_classify(args.classify, args.output, args.data_file,
+                                  args.workers, args.chunk_size, args.format, args.tokenizer)
+        except (LookupError, OSError, ValueError) as error:
+            parser.exit(1, f"Could not classify {args.classify}: {error}\n")
+        print(f"Classified {stats['messages']} messages in {stats['seconds']:.2f}s "
+              f"({stats['messages_per_second']:.1f} msg/s)", file=sys.stderr)
+        raise SystemExit(0)
+    
     # For demonstration, create a sample data file
     with open('customer_support_data.json', 'w') as f:
         json.dump(sample_data, f, indent=4)
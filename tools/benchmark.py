@@ -0,0 +1,191 @@
+"""
+Reproducible chatbot benchmark suite
+
+For each catalog scale this measures:
+  - SimplePatternChatbot construction time (full preprocessing and from a snapshot)
+  - peak traced memory during construction
+  - find_intent latency percentiles over a mixed query set
+  - EntityAwareChatbot.get_response throughput
+
+Catalogs and queries come from tools/synth_catalog.py with fixed seeds, so
+runs on different commits are comparable. Results are written as JSON.
+
+Usage:
+    python tools/benchmark.py --scales current,small,medium -o bench.json
+    python tools/benchmark.py --scales current,small --compare bench.json
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import main_code
+from synth_catalog import make_queries, write_catalog
+
+# Scale descriptions rather than measurements; never compared
+DESCRIPTIVE_KEYS = {"intents", "patterns", "queries"}
+
+# name -> (intents, patterns per intent); "current" is the shipped catalog
+SCALES = {
+    "current": None,
+    "small": (100, 10),
+    "medium": (1000, 10),
+    "large": (10000, 10),
+}
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[rank]
+
+
+def git_commit():
+    """Current commit hash, if the benchmark runs inside a git checkout"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_ROOT,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_catalog(scale, directory):
+    """Write the catalog for a scale to directory and return (path, catalog)"""
+    if SCALES[scale] is None:
+        return write_catalog(0, directory)
+    n_intents, patterns_per_intent = SCALES[scale]
+    return write_catalog(n_intents, directory, patterns_per_intent, name=scale)
+
+
+def bench_scale(scale, directory, n_queries, measure_memory):
+    """Run every measurement for one catalog scale"""
+    data_file, catalog = load_catalog(scale, directory)
+    snapshot_file = os.path.join(directory, "{}.snapshot".format(scale))
+    queries = make_queries(catalog, n_queries)
+    result = {
+        "scale": scale,
+        "intents": len(catalog["intents"]),
+        "patterns": sum(len(intent["patterns"]) for intent in catalog["intents"]),
+        "queries": len(queries),
+    }
+
+    start = time.perf_counter()
+    chatbot = main_code.SimplePatternChatbot(data_file, snapshot_file=snapshot_file, use_snapshot=False)
+    result["construct_s"] = time.perf_counter() - start
+
+    chatbot.save_snapshot()
+    start = time.perf_counter()
+    main_code.SimplePatternChatbot(data_file, snapshot_file=snapshot_file)
+    result["construct_from_snapshot_s"] = time.perf_counter() - start
+
+    if measure_memory:
+        tracemalloc.start()
+        main_code.SimplePatternChatbot(data_file, snapshot_file=snapshot_file, use_snapshot=False)
+        result["construct_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    latencies = []
+    for query in queries:
+        start = time.perf_counter_ns()
+        chatbot.find_intent(query)
+        latencies.append(time.perf_counter_ns() - start)
+    latencies.sort()
+    result["find_intent_us"] = {
+        "mean": statistics.fmean(latencies) / 1000,
+        "p50": percentile(latencies, 0.50) / 1000,
+        "p95": percentile(latencies, 0.95) / 1000,
+        "p99": percentile(latencies, 0.99) / 1000,
+    }
+
+    entity_chatbot = main_code.EntityAwareChatbot(data_file, snapshot_file=snapshot_file)
+    start = time.perf_counter()
+    for i, query in enumerate(queries):
+        entity_chatbot.get_response(query, session_id="user-{}".format(i % 100))
+    elapsed = time.perf_counter() - start
+    result["get_response_per_s"] = len(queries) / elapsed if elapsed else None
+
+    return result
+
+
+def flatten(result, prefix=""):
+    """Flatten nested metrics into {"a.b": value} for comparisons"""
+    flat = {}
+    for key, value in result.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, prefix + key + "."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and key not in DESCRIPTIVE_KEYS:
+            flat[prefix + key] = value
+    return flat
+
+
+def compare(baseline, current):
+    """Print every metric next to its baseline value and the ratio"""
+    baseline_by_scale = {result["scale"]: flatten(result) for result in baseline["results"]}
+    for result in current["results"]:
+        before = baseline_by_scale.get(result["scale"])
+        if before is None:
+            continue
+        print("== {} ==".format(result["scale"]))
+        for metric, value in flatten(result).items():
+            if metric in before and before[metric]:
+                print("  {:<32} {:>14.3f} -> {:>14.3f}  ({:.2f}x)".format(
+                    metric, before[metric], value, value / before[metric]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the customer support chatbot")
+    parser.add_argument("--scales", default="current,small,medium",
+                        help="Comma-separated scales: " + ", ".join(SCALES))
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--no-memory", action="store_true", help="Skip tracemalloc measurements")
+    parser.add_argument("-o", "--output", help="Write JSON results here (default: stdout)")
+    parser.add_argument("--compare", metavar="BASELINE", help="Compare with an earlier results file")
+    args = parser.parse_args()
+
+    # Synthetic catalogs reuse short patterns across intents; skip the collision warnings
+    logging.getLogger(main_code.__name__).setLevel(logging.ERROR)
+
+    report = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "results": [],
+    }
+    with tempfile.TemporaryDirectory() as directory:
+        for scale in args.scales.split(","):
+            report["results"].append(bench_scale(scale.strip(), directory, args.queries, not args.no_memory))
+
+    if sys.platform != "win32":
+        import resource
+        report["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare) as file:
+            compare(json.load(file), report)
+
+
+if __name__ == "__main__":
+    main()
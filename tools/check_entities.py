@@ -0,0 +1,115 @@
+"""
+Regression check for the entity scanner
+
+Compares EntityScanner (one search per entity type, stopping at the first
+match) against the original extraction (one re.findall per entity pattern,
+first match kept) on a fixed corpus of support messages and on randomly
+assembled messages, and reports every difference. The check runs with the
+built-in patterns, then again after registering extra entity types and
+replacing one at runtime.
+
+Usage:
+    python tools/check_entities.py [--random N] [--seed S]
+"""
+import argparse
+import os
+import random
+import re
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main_code import ENTITY_PATTERNS, EntityScanner
+
+CORPUS = [
+    "Where is my order number ABC12345?",
+    "order #XY98765Z has not arrived",
+    "ORDER 1234567 and order 7654321",
+    "I ordered product code P-100 yesterday",
+    "product code ABC123 and product # XYZ",
+    "Send the label to jane.doe@example.com please",
+    "emails: a@b.co, second.one@mail.example.org",
+    "order abc123@example.com",
+    "12-05@example.com delivered on 12/05/2024",
+    "delivered 1/2 or maybe 01-02-23",
+    "product 12/05/2024",
+    "order number 12/05/2024",
+    "no entities here",
+    "",
+    "order",
+    "product code",
+    "my order number is 123 and product code is 9",
+    "Order Number: AB12CD34 placed 3/14",
+    "ticket #123456 about tracking 1Z999AA10123456784",
+    "call +1 555-123-4567 re ticket 9876",
+    "order number AB12 ticket # 42 call 555 1234 567",
+]
+
+# Registered at runtime: no group, one group, several groups, and a
+# replacement for a built-in type
+RUNTIME_PATTERNS = {
+    'phone': r'\+?\d[\d\s-]{7,}\d',
+    'ticket': r'ticket\s*#?\s*(\d{4,8})',
+    'tracking': r'(1Z)([0-9A-Z]{16})',
+    'order_number': r'order\s+(?:number|#|no\.?)?\s*([A-Z0-9]{4,12})',
+}
+
+FRAGMENTS = [
+    "order", "Order", "number", "#", "product", "code", "ABC123", "XY98765Z",
+    "1234567", "jane@example.com", "a.b-c@mail.co", "12/05/2024", "1-2", "3/14/99",
+    "refund", "please", "@", ".", "-", "/", "where", "is", "my", "42",
+    "ticket", "no.", "AB12", "1Z999AA10123456784", "+1", "555-123-4567", "555",
+]
+
+
+def legacy_extract(text, patterns):
+    """Entity extraction as originally implemented with re.findall"""
+    found_entities = {}
+    for entity_type, pattern in patterns.items():
+        matches = re.findall(pattern, text, re.IGNORECASE)
+        if matches:
+            found_entities[entity_type] = matches[0]
+    return found_entities
+
+
+def random_messages(count, seed):
+    """Messages assembled from entity-like fragments"""
+    rng = random.Random(seed)
+    for _ in range(count):
+        parts = [rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 8))]
+        yield rng.choice([" ", "", "  "]).join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare EntityScanner with re.findall extraction")
+    parser.add_argument("--random", type=int, default=5000, help="Number of random messages")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    messages = CORPUS + list(random_messages(args.random, args.seed))
+    scanner = EntityScanner(ENTITY_PATTERNS)
+    patterns = dict(ENTITY_PATTERNS)
+    differences = 0
+    checked = 0
+    for stage in ("built-in", "runtime"):
+        if stage == "runtime":
+            for entity_type, pattern in RUNTIME_PATTERNS.items():
+                scanner.register(entity_type, pattern)
+                patterns[entity_type] = pattern
+            if dict(scanner.patterns) != patterns:
+                differences += 1
+                print(f"MISMATCH registered patterns: expected {patterns}, got {dict(scanner.patterns)}")
+        for text in messages:
+            expected = legacy_extract(text, patterns)
+            actual = scanner.scan(text)
+            checked += 1
+            if actual != expected or list(actual) != list(expected):
+                differences += 1
+                print(f"MISMATCH ({stage} patterns) {text!r}: expected {expected}, got {actual}")
+
+    print(f"Checked {checked} messages, {differences} mismatches")
+    return 1 if differences else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Check and measure fuzzy keyword matching
+
+Misspells one keyword of catalog patterns (deletion, insertion, substitution
+or transposition) and reports:
+  - how many of the misspelled queries fall back without and with fuzzy matching
+  - FuzzyMatcher.correct against a brute-force scan of every catalog keyword
+  - find_intent latency without and with fuzzy matching
+
+Usage:
+    python tools/check_fuzzy.py [--intents N] [--queries Q] [--budget B] [--check C]
+"""
+import argparse
+import logging
+import os
+import random
+import string
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import main_code
+from synth_catalog import write_catalog
+
+
+def misspell(word, rng):
+    """Apply one random edit to word"""
+    position = rng.randrange(len(word))
+    edit = rng.choice(("delete", "insert", "substitute", "transpose"))
+    if edit == "delete":
+        return word[:position] + word[position + 1:]
+    if edit == "insert":
+        return word[:position] + rng.choice(string.ascii_lowercase) + word[position:]
+    if edit == "substitute":
+        return word[:position] + rng.choice(string.ascii_lowercase) + word[position + 1:]
+    position = min(position, len(word) - 2)
+    return word[:position] + word[position + 1] + word[position] + word[position + 2:]
+
+
+def make_typo_queries(catalog, n_queries, min_length, seed=2):
+    """Catalog patterns with one long-enough word misspelled"""
+    rng = random.Random(seed)
+    patterns = [pattern for intent in catalog["intents"] for pattern in intent["patterns"]]
+    queries = []
+    while len(queries) < n_queries:
+        words = rng.choice(patterns).split()
+        candidates = [i for i, word in enumerate(words) if len(word) >= min_length and word.isalpha()]
+        if not candidates:
+            continue
+        i = rng.choice(candidates)
+        words[i] = misspell(words[i].lower(), rng)
+        queries.append(" ".join(words))
+    return queries
+
+
+def brute_force_correct(matcher, keyword_ids, token):
+    """Closest keyword by scanning every keyword, same tie rule as FuzzyMatcher"""
+    limit = matcher.max_distance(len(token))
+    best_id, best_distance = None, limit + 1
+    for keyword_id in sorted(keyword_ids):
+        distance = main_code.edit_distance(token, matcher.vocabulary.tokens[keyword_id], limit)
+        if distance < best_distance:
+            best_id, best_distance = keyword_id, distance
+    return best_id
+
+
+def fallback_rate(chatbot, queries):
+    return sum(chatbot.find_intent(query)[0] is None for query in queries) / len(queries)
+
+
+def mean_latency_us(chatbot, queries):
+    start = time.perf_counter()
+    for query in queries:
+        chatbot.find_intent(query)
+    return (time.perf_counter() - start) * 1e6 / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check typo-tolerant keyword matching")
+    parser.add_argument("--intents", type=int, default=0,
+                        help="Use a synthetic catalog with this many intents (default: shipped catalog)")
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--budget", type=int, default=main_code.FUZZY_BUDGET)
+    parser.add_argument("--check", type=int, default=500,
+                        help="Misspelled keywords to compare with brute force (it scans every keyword)")
+    args = parser.parse_args()
+
+    logging.getLogger(main_code.__name__).setLevel(logging.ERROR)
+    with tempfile.TemporaryDirectory() as directory:
+        data_file, catalog = write_catalog(args.intents, directory)
+        # No preprocess cache, so every query pays for its fuzzy lookups
+        exact = main_code.SimplePatternChatbot(data_file, use_snapshot=False, preprocess_cache_size=0)
+        fuzzy = main_code.SimplePatternChatbot(data_file, use_snapshot=False, preprocess_cache_size=0,
+                                               fuzzy=True, fuzzy_budget=args.budget)
+
+    min_length = main_code.FUZZY_DISTANCE_LIMITS[0][0]
+    queries = make_typo_queries(catalog, args.queries, min_length)
+
+    # Check the indexed lookup against brute force on the first misspelled keywords
+    model = fuzzy.model
+    unknown = [
+        keyword for query in queries for keyword in fuzzy.extract_keywords(query)
+        if model.vocabulary.get(keyword) not in model.keyword_index
+    ]
+    differences = 0
+    for keyword in unknown[:args.check]:
+        model.fuzzy.cache.clear()
+        actual, _ = model.fuzzy.correct(keyword, float("inf"))
+        expected = brute_force_correct(model.fuzzy, model.keyword_index, keyword)
+        if actual != expected:
+            differences += 1
+            tokens = model.vocabulary.tokens
+            print(f"MISMATCH {keyword!r}: expected {expected is not None and tokens[expected]}, "
+                  f"got {actual is not None and tokens[actual]}")
+
+    print(f"{len(queries)} misspelled queries over {len(model.keyword_index)} catalog keywords")
+    print(f"fallback rate: exact {fallback_rate(exact, queries):.1%}, fuzzy {fallback_rate(fuzzy, queries):.1%}")
+    model.fuzzy.cache.clear()
+    print(f"find_intent: exact {mean_latency_us(exact, queries):.1f} us/query, "
+          f"fuzzy {mean_latency_us(fuzzy, queries):.1f} us/query (correction cache starts cold)")
+    print(f"index vs brute force: {differences} differences in {min(args.check, len(unknown))} keywords")
+    return 1 if differences else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""
+Parity check for the fast tokenizer
+
+Runs fast_word_tokenize and nltk.word_tokenize over the catalog patterns, a
+fixed corpus of support messages and a synthetic query mix (plus an optional
+chat log), and reports every text on which the token lists differ. It then
+compares find_intent between a chatbot using each tokenizer and reports how
+long each tokenizer took per text.
+
+Usage:
+    python tools/check_tokenizer.py [--data-file FILE] [--queries N] [--input LOG]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import nltk
+
+import main_code
+from synth_catalog import make_queries
+
+CORPUS = [
+    "Hi there!",
+    "Where is my order?? It's been 2 weeks...",
+    "I can't log in to my account, please help.",
+    "My order #AB12345678 hasn't arrived.",
+    "Email me at jane.doe@example.com.",
+    "I was charged $5.00 twice (order 12/05/2024)",
+    "Refund for 3,000 items, ordered at 10:30",
+    "I cannot find the e-mail/password reset link",
+    "gonna need a refund -- the product code XK200 is broken",
+    "what're you doing with my data?!",
+    "Thanks. Bye.",
+    "Order shipped. Where is it now?",
+    "\"Fast\" shipping isn't fast",
+    "It's 'broken'",
+    "I'd like to cancel; I've changed my mind",
+    "café order problem",
+    "",
+    "   ",
+]
+
+
+def collect_texts(data_file, n_queries, input_file):
+    """Catalog patterns, the fixed corpus, synthetic queries and an optional chat log"""
+    with open(data_file) as file:
+        catalog = json.load(file)
+    texts = [pattern for intent in catalog["intents"] for pattern in intent["patterns"]]
+    texts += CORPUS
+    texts += make_queries(catalog, n_queries)
+    if input_file:
+        texts += [text for _, text in main_code.iter_messages(input_file)]
+    return texts
+
+
+def time_per_text(tokenize, texts):
+    """Mean microseconds per text"""
+    start = time.perf_counter()
+    for text in texts:
+        tokenize(text)
+    return (time.perf_counter() - start) * 1e6 / len(texts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare fast_word_tokenize with nltk.word_tokenize")
+    parser.add_argument("--data-file", default=os.path.join(REPO_ROOT, "customer_support_data.json"))
+    parser.add_argument("--queries", type=int, default=2000, help="Synthetic queries to add")
+    parser.add_argument("--input", help="Also check every message of a JSONL or text chat log")
+    args = parser.parse_args()
+
+    logging.getLogger(main_code.__name__).setLevel(logging.ERROR)
+    main_code.ensure_nltk_resources()
+    texts = collect_texts(args.data_file, args.queries, args.input)
+
+    # preprocess_text tokenizes lowercased text
+    lowered = [text.lower() for text in texts]
+    token_differences = 0
+    for text in lowered:
+        expected = nltk.word_tokenize(text)
+        actual = main_code.fast_word_tokenize(text)
+        if actual != expected:
+            token_differences += 1
+            print(f"TOKENS {text!r}:\n  nltk {expected}\n  fast {actual}")
+
+    reference = main_code.SimplePatternChatbot(args.data_file, use_snapshot=False, preprocess_cache_size=0)
+    fast = main_code.SimplePatternChatbot(args.data_file, use_snapshot=False, preprocess_cache_size=0,
+                                          tokenizer="fast")
+    intent_differences = 0
+    for text in texts:
+        expected_intent, expected_score = reference.find_intent(text)
+        actual_intent, actual_score = fast.find_intent(text)
+        expected = (expected_intent and expected_intent["tag"], expected_score)
+        actual = (actual_intent and actual_intent["tag"], actual_score)
+        if actual != expected:
+            intent_differences += 1
+            print(f"INTENT {text!r}: nltk {expected}, fast {actual}")
+
+    supported = sum(map(main_code.fast_path_supported, lowered))
+    print(f"Checked {len(texts)} texts: {token_differences} token differences, "
+          f"{intent_differences} find_intent differences")
+    print(f"fast path handled {supported} texts ({supported / len(texts):.1%}), the rest fell back to NLTK")
+    print(f"nltk {time_per_text(nltk.word_tokenize, lowered):.1f} us/text, "
+          f"fast {time_per_text(main_code.fast_word_tokenize, lowered):.1f} us/text")
+    return 1 if token_differences or intent_differences else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""
+Check find_top_intents against exhaustive scoring
+
+Scores every pattern of the catalog for each query, takes the k best (ties
+in catalog order) and compares them with the pruned top-k retrieval. Also
+reports how long each approach took.
+
+Usage:
+    python tools/check_top_k.py [--intents N] [--queries Q] [-k K]
+"""
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import main_code
+from synth_catalog import make_queries, write_catalog
+
+
+def exhaustive_top_intents(chatbot, user_input, k):
+    """Score every pattern and keep the k best, earliest pattern first on ties"""
+    user_keywords = set(chatbot.extract_keywords(user_input))
+    scored = []
+    for intent_idx, intent in enumerate(chatbot.data['intents']):
+        for pattern_idx, processed in enumerate(intent['processed_patterns']):
+            pattern_keywords = set(chatbot.keywords_from_processed(processed))
+            matches = len(user_keywords & pattern_keywords)
+            if matches:
+                scored.append((-matches / len(pattern_keywords), intent_idx, pattern_idx))
+    scored.sort()
+    return [
+        (chatbot.data['intents'][intent_idx]['tag'],
+         chatbot.data['intents'][intent_idx]['patterns'][pattern_idx], -score)
+        for score, intent_idx, pattern_idx in scored[:k]
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare pruned top-k retrieval with exhaustive scoring")
+    parser.add_argument("--intents", type=int, default=0,
+                        help="Use a synthetic catalog with this many intents (default: shipped catalog)")
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("-k", type=int, default=3)
+    args = parser.parse_args()
+
+    logging.getLogger(main_code.__name__).setLevel(logging.ERROR)
+    with tempfile.TemporaryDirectory() as directory:
+        data_file, catalog = write_catalog(args.intents, directory)
+        chatbot = main_code.SimplePatternChatbot(data_file, use_snapshot=False)
+
+    queries = make_queries(catalog, args.queries)
+    mismatches = 0
+    pruned_s = exhaustive_s = 0.0
+    for query in queries:
+        start = time.perf_counter()
+        actual = [
+            (intent['tag'], pattern, score)
+            for intent, pattern, score in chatbot.find_top_intents(query, args.k)
+        ]
+        pruned_s += time.perf_counter() - start
+
+        start = time.perf_counter()
+        expected = exhaustive_top_intents(chatbot, query, args.k)
+        exhaustive_s += time.perf_counter() - start
+
+        if actual != expected:
+            mismatches += 1
+            print(f"MISMATCH {query!r}:\n  expected {expected}\n  got      {actual}")
+
+    print(f"Checked {len(queries)} queries (k={args.k}), {mismatches} mismatches")
+    print(f"pruned {pruned_s * 1e6 / len(queries):.1f} us/query, "
+          f"exhaustive {exhaustive_s * 1e6 / len(queries):.1f} us/query (includes preprocessing)")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,96 @@
+"""
+Peak memory and time of loading a catalog
+
+Loads the same catalog three ways and reports, for each, the peak Python
+memory traced by tracemalloc during the load, the memory still held by the
+resulting model and the load time:
+  - document: json.load the whole file, then build the model from it
+  - streamed: SimplePatternChatbot.load_catalog, one intent at a time
+  - streamed, no text: as above with keep_pattern_text=False
+The streamed loads also run from a JSONL copy of the catalog.
+
+Usage:
+    python tools/load_report.py [--intents N] [--patterns-per-intent P] [--data-file FILE]
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import main_code
+from synth_catalog import make_catalog
+
+
+def load_document(chatbot, data_file):
+    """The pre-streaming load: parse the whole document, then build"""
+    with open(data_file, 'rb') as file:
+        raw_data = file.read()
+    content_hash = chatbot.compute_content_hash(raw_data)
+    return chatbot.build_model(json.loads(raw_data)["intents"], content_hash)
+
+
+def measure(load):
+    """(model, peak traced bytes, retained traced bytes, seconds) of load()"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    model = load()
+    seconds = time.perf_counter() - start
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return model, peak - before, current - before, seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare whole-document and streamed catalog loading")
+    parser.add_argument("--intents", type=int, default=2000,
+                        help="Synthetic catalog size (ignored with --data-file)")
+    parser.add_argument("--patterns-per-intent", type=int, default=10)
+    parser.add_argument("--data-file", help="Measure this catalog instead of a synthetic one")
+    args = parser.parse_args()
+
+    logging.getLogger(main_code.__name__).setLevel(logging.ERROR)
+    with tempfile.TemporaryDirectory() as directory:
+        data_file = args.data_file
+        if not data_file:
+            data_file = os.path.join(directory, "catalog.json")
+            with open(data_file, "w") as file:
+                json.dump(make_catalog(args.intents, args.patterns_per_intent), file)
+        jsonl_file = os.path.join(directory, "catalog.jsonl")
+        with open(jsonl_file, "w") as file:
+            for intent in main_code.iter_intents(data_file):
+                file.write(json.dumps(intent) + "\n")
+
+        # No preprocess cache, so every load pays for the same NLTK work
+        chatbot = main_code.SimplePatternChatbot(data_file, use_snapshot=False, preprocess_cache_size=0)
+        text_less = main_code.SimplePatternChatbot(data_file, use_snapshot=False, preprocess_cache_size=0,
+                                                   keep_pattern_text=False)
+
+        runs = [
+            ("document", lambda: load_document(chatbot, data_file)),
+            ("streamed", lambda: chatbot.load_catalog(data_file)),
+            ("streamed, no text", lambda: text_less.load_catalog(data_file)),
+            ("streamed JSONL", lambda: chatbot.load_catalog(jsonl_file)),
+        ]
+        print("{}: {:,} bytes".format(os.path.basename(data_file), os.path.getsize(data_file)))
+        print("{:<20} {:>14} {:>14} {:>9}".format("load", "peak bytes", "retained bytes", "seconds"))
+        for name, load in runs:
+            model, peak, retained, seconds = measure(load)
+            print("{:<20} {:>14,} {:>14,} {:>9.2f}".format(name, peak, retained, seconds))
+            del model
+        print("max RSS {} KiB".format(chatbot.load_stats["max_rss_kb"]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+"""
+Concurrent conversation load test and replay harness
+
+Replays multi-turn conversations against an in-process chatbot with N
+simulated users, each a thread running one conversation at a time in its
+own session. For every user count it reports:
+  - per-turn get_response latency percentiles and throughput
+  - error and fallback rates
+  - state mismatches: after every turn the session's current_intent,
+    previous_intents and entities are compared with a sequential replay of
+    the same conversation, so state leaking between concurrent sessions or
+    lost updates show up as mismatches
+
+Conversations are synthetic (catalog queries with entities unique to each
+conversation) or read from a JSONL file, either one conversation per line
+({"id": ..., "turns": [...]}) or one message per line grouped by its
+"conversation_id"/"session_id" field in file order.
+
+Usage:
+    python tools/load_test.py [--users 1,8,32] [--conversations C] [--turns T] [--think-ms MS]
+                              [--input FILE] [--intents N] [--chatbot entity|simple] [-o results.json]
+"""
+import argparse
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import main_code
+from benchmark import percentile
+from synth_catalog import make_queries, write_catalog
+
+CHATBOTS = {
+    "entity": main_code.EntityAwareChatbot,
+    "simple": main_code.SimplePatternChatbot,
+}
+
+
+def make_conversations(catalog, n_conversations, turns, seed=3):
+    """
+    Synthetic conversations of catalog queries
+
+    Some turns mention an order number or email address unique to their
+    conversation, so entities seen in the wrong session are detectable.
+    """
+    rng = random.Random(seed)
+    queries = make_queries(catalog, n_conversations * turns, seed=seed)
+    conversations = []
+    for index in range(n_conversations):
+        script = []
+        for turn in range(turns):
+            text = queries[index * turns + turn]
+            draw = rng.random()
+            if draw < 0.15:
+                text += " order number OR{:08d}".format(index)
+            elif draw < 0.25:
+                text += " reach me at user{}@example.com".format(index)
+            script.append(text)
+        conversations.append(("conversation-{}".format(index), script))
+    return conversations
+
+
+def load_conversations(input_file):
+    """(conversation id, [turn texts]) pairs from a JSONL file"""
+    conversations = OrderedDict()
+    with open(input_file, encoding="utf-8") as file:
+        for line_no, line in enumerate(file, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if "turns" in record:
+                conversations[str(record.get("id", line_no))] = [str(text) for text in record["turns"]]
+                continue
+            conversation_id = record.get("conversation_id", record.get("session_id"))
+            text = record.get("text", record.get("message", ""))
+            conversations.setdefault(str(conversation_id), []).append(str(text))
+    return list(conversations.items())
+
+
+def session_state(chatbot, session_id):
+    """Comparable snapshot of a session's context and entities"""
+    session = chatbot.sessions.get(session_id)
+    return (
+        session.context["current_intent"],
+        list(session.context["previous_intents"]),
+        dict(session.entities),
+    )
+
+
+def replay_sequentially(chatbot, conversations, prefix):
+    """Expected session state after every turn, one conversation at a time"""
+    expected = []
+    for conversation_id, turns in conversations:
+        session_id = "{}{}".format(prefix, conversation_id)
+        states = []
+        for text in turns:
+            chatbot.get_response(text, session_id=session_id)
+            states.append(session_state(chatbot, session_id))
+        chatbot.sessions.drop(session_id)
+        expected.append(states)
+    return expected
+
+
+def run_users(chatbot, conversations, users, think_s, prefix):
+    """
+    Replay conversations with users concurrent threads
+
+    Returns (turn records, observed states per conversation, wall seconds);
+    a turn record is (latency seconds, fallback, error).
+    """
+    pending = queue.Queue()
+    for index in range(len(conversations)):
+        pending.put(index)
+    fallbacks = set(chatbot.fallback_responses)
+    records = []
+    observed = [None] * len(conversations)
+    records_lock = threading.Lock()
+
+    def user(seed):
+        rng = random.Random(seed)
+        local = []
+        while True:
+            try:
+                index = pending.get_nowait()
+            except queue.Empty:
+                break
+            conversation_id, turns = conversations[index]
+            session_id = "{}{}".format(prefix, conversation_id)
+            states = []
+            for text in turns:
+                if think_s:
+                    time.sleep(rng.uniform(0, 2 * think_s))
+                error = None
+                response = None
+                start = time.perf_counter()
+                try:
+                    response = chatbot.get_response(text, session_id=session_id)
+                except Exception as exc:  # Counted and reported, the user carries on
+                    error = "{}: {}".format(type(exc).__name__, exc)
+                latency = time.perf_counter() - start
+                local.append((latency, response in fallbacks, error))
+                states.append(session_state(chatbot, session_id))
+            chatbot.sessions.drop(session_id)
+            observed[index] = states
+        with records_lock:
+            records.extend(local)
+
+    threads = [threading.Thread(target=user, args=(seed,)) for seed in range(users)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return records, observed, time.perf_counter() - start
+
+
+def count_mismatches(conversations, expected, observed, limit=5):
+    """Turns whose observed state differs from the sequential replay"""
+    mismatches = 0
+    for (conversation_id, turns), expected_states, observed_states in zip(conversations, expected, observed):
+        for turn, (want, got) in enumerate(zip(expected_states, observed_states)):
+            if want != got:
+                mismatches += 1
+                if mismatches <= limit:
+                    print("MISMATCH {} turn {} {!r}:\n  expected {}\n  got      {}".format(
+                        conversation_id, turn, turns[turn], want, got))
+    return mismatches
+
+
+def summarize(users, records, seconds, mismatches):
+    latencies = sorted(latency for latency, _, _ in records)
+    errors = [error for _, _, error in records if error is not None]
+    turns = len(records)
+    result = {
+        "users": users,
+        "turns": turns,
+        "seconds": seconds,
+        "turns_per_s": turns / seconds if seconds else None,
+        "latency_ms": {
+            name: percentile(latencies, fraction) * 1000
+            for name, fraction in (("p50", 0.50), ("p90", 0.90), ("p99", 0.99), ("max", 1.0))
+        },
+        "error_rate": len(errors) / turns,
+        "fallback_rate": sum(fallback for _, fallback, _ in records) / turns,
+        "state_mismatches": mismatches,
+    }
+    if errors:
+        result["first_error"] = errors[0]
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay concurrent conversations against the chatbot")
+    parser.add_argument("--users", default="1,8,32", help="Comma-separated concurrent user counts")
+    parser.add_argument("--conversations", type=int, default=500, help="Synthetic conversations")
+    parser.add_argument("--turns", type=int, default=6, help="Turns per synthetic conversation")
+    parser.add_argument("--think-ms", type=float, default=0.0,
+                        help="Mean pause before each turn (uniform between 0 and twice this)")
+    parser.add_argument("--input", help="Replay conversations from this JSONL file instead")
+    parser.add_argument("--intents", type=int, default=0,
+                        help="Use a synthetic catalog with this many intents (default: shipped catalog)")
+    parser.add_argument("--chatbot", choices=sorted(CHATBOTS), default="entity")
+    parser.add_argument("-o", "--output", help="Also write JSON results here")
+    args = parser.parse_args()
+
+    logging.getLogger(main_code.__name__).setLevel(logging.ERROR)
+    with tempfile.TemporaryDirectory() as directory:
+        data_file, catalog = write_catalog(args.intents, directory)
+        # Every conversation keeps its session until it ends
+        sessions = main_code.SessionStore(ttl=None, max_sessions=None)
+        chatbot = CHATBOTS[args.chatbot](data_file, use_snapshot=False, session_store=sessions)
+
+    if args.input:
+        conversations = load_conversations(args.input)
+    else:
+        conversations = make_conversations(catalog, args.conversations, args.turns)
+    expected = replay_sequentially(chatbot, conversations, "reference:")
+
+    results = []
+    print("{:>6} {:>7} {:>9} {:>8} {:>8} {:>8} {:>8} {:>7} {:>9} {:>10}".format(
+        "users", "turns", "turns/s", "p50 ms", "p90 ms", "p99 ms", "max ms", "errors", "fallback", "mismatches"))
+    for users in [int(count) for count in args.users.split(",")]:
+        records, observed, seconds = run_users(
+            chatbot, conversations, users, args.think_ms / 1000, "users-{}:".format(users))
+        result = summarize(users, records, seconds, count_mismatches(conversations, expected, observed))
+        latency = result["latency_ms"]
+        print("{:>6} {:>7} {:>9.0f} {:>8.2f} {:>8.2f} {:>8.2f} {:>8.2f} {:>7.1%} {:>9.1%} {:>10}".format(
+            users, result["turns"], result["turns_per_s"], latency["p50"], latency["p90"], latency["p99"],
+            latency["max"], result["error_rate"], result["fallback_rate"], result["state_mismatches"]))
+        if "first_error" in result:
+            print("  first error: {}".format(result["first_error"]))
+        results.append(result)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"conversations": len(conversations), "results": results}, file, indent=2)
+            file.write("\n")
+    failed = any(result["error_rate"] or result["state_mismatches"] for result in results)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""
+Memory report for the in-memory intent catalog
+
+Builds the catalog structures twice from the same preprocessed patterns: once
+in the original layout (JSON dicts with processed pattern strings, a keyword
+index of (intent, pattern, count) tuples and a string-keyed exact-match
+table) and once as the compact interned IntentModel. Reports the retained
+size of every structure and the total traced by tracemalloc for each layout.
+
+Usage:
+    python tools/memory_report.py [--intents N] [--patterns-per-intent P]
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import sys
+import tempfile
+import tracemalloc
+from array import array
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import main_code
+from synth_catalog import write_catalog
+
+
+def deep_size(obj, seen=None):
+    """Bytes retained by obj and everything it references (each object counted once)"""
+    if seen is None:
+        seen = set()
+    # Records point back at their model; the model's parts are reported separately
+    if id(obj) in seen or isinstance(obj, main_code.IntentModel):
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(key, seen) + deep_size(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_size(item, seen) for item in obj)
+    elif isinstance(obj, (str, bytes, int, float, array)) or obj is None:
+        pass
+    elif hasattr(obj, "__slots__"):
+        size += sum(deep_size(getattr(obj, slot), seen) for slot in obj.__slots__ if hasattr(obj, slot))
+    elif hasattr(obj, "__dict__"):
+        size += deep_size(vars(obj), seen)
+    return size
+
+
+def build_legacy(catalog, processed_by_pattern, keywords_from_processed):
+    """The catalog structures as originally laid out"""
+    data = json.loads(json.dumps(catalog))
+    keyword_index = {}
+    exact_lookup = {}
+    for intent_idx, intent in enumerate(data["intents"]):
+        intent["processed_patterns"] = [processed_by_pattern[pattern] for pattern in intent["patterns"]]
+        for pattern_idx, processed in enumerate(intent["processed_patterns"]):
+            exact_lookup.setdefault(processed, intent_idx)
+            pattern_keywords = set(keywords_from_processed(processed))
+            for keyword in pattern_keywords:
+                keyword_index.setdefault(keyword, []).append((intent_idx, pattern_idx, len(pattern_keywords)))
+    return {"intents": data, "keyword_index": keyword_index, "exact_lookup": exact_lookup}
+
+
+def build_compact(catalog, processed_by_pattern, keywords_from_processed):
+    """The catalog structures as an interned IntentModel"""
+    model = main_code.IntentModel(main_code.Vocabulary(), None)
+    for intent in json.loads(json.dumps(catalog))["intents"]:
+        model.add_intent(intent)
+        for pattern in intent["patterns"]:
+            processed = processed_by_pattern[pattern]
+            model.add_pattern(processed, set(keywords_from_processed(processed)))
+    model.finalize()
+    return model
+
+
+def compact_structures(model):
+    """Named structures of a compact model, for the per-structure breakdown"""
+    return {
+        "intents": model.intents,
+        "vocabulary": model.vocabulary,
+        "pattern arrays": [model.intent_offsets, model.pattern_offsets, model.pattern_tokens,
+                           model.pattern_intents, model.keyword_counts],
+        "keyword_index": model.keyword_index,
+        "exact_lookup": [model.exact_hashes, model.exact_patterns],
+    }
+
+
+def traced_bytes(build):
+    """Bytes still allocated after build() returns, measured with tracemalloc"""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def report(name, structures, traced):
+    seen = set()
+    print("== {} ==".format(name))
+    for structure, value in structures.items():
+        print("  {:<16} {:>12,} bytes".format(structure, deep_size(value, seen)))
+    print("  {:<16} {:>12,} bytes".format("traced total", traced))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare legacy and compact catalog memory use")
+    parser.add_argument("--intents", type=int, default=0,
+                        help="Use a synthetic catalog with this many intents (default: shipped catalog)")
+    parser.add_argument("--patterns-per-intent", type=int, default=10)
+    args = parser.parse_args()
+
+    logging.getLogger(main_code.__name__).setLevel(logging.ERROR)
+    with tempfile.TemporaryDirectory() as directory:
+        data_file, catalog = write_catalog(args.intents, directory, args.patterns_per_intent)
+        # Preprocess once so both layouts are built without NLTK in the measurement
+        chatbot = main_code.SimplePatternChatbot(data_file, use_snapshot=False)
+    processed_by_pattern = chatbot.model.processed_by_pattern()
+    keywords_from_processed = chatbot.keywords_from_processed
+
+    legacy, legacy_traced = traced_bytes(
+        lambda: build_legacy(catalog, processed_by_pattern, keywords_from_processed))
+    model, compact_traced = traced_bytes(
+        lambda: build_compact(catalog, processed_by_pattern, keywords_from_processed))
+
+    patterns = sum(len(intent["patterns"]) for intent in catalog["intents"])
+    print("{} intents, {} patterns, {} distinct tokens".format(
+        len(catalog["intents"]), patterns, len(model.vocabulary)))
+    report("legacy", legacy, legacy_traced)
+    report("compact", compact_structures(model), compact_traced)
+    if compact_traced:
+        print("compact / legacy: {:.2f}".format(compact_traced / legacy_traced))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Measure chatbot cold-start time
+
+Runs a fresh Python process that imports main_code, builds an
+EntityAwareChatbot and answers a first message, and reports how long each
+step took. Results are printed as JSON so they can be compared between
+commits.
+
+Usage:
+    python tools/startup_time.py [--data-file FILE] [--runs N]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Executed in a fresh interpreter so the import is really cold
+CHILD_SCRIPT = """
+import json, sys, time
+t0 = time.perf_counter()
+import main_code
+t1 = time.perf_counter()
+chatbot = main_code.EntityAwareChatbot(sys.argv[1])
+t2 = time.perf_counter()
+chatbot.get_response("Hello")
+t3 = time.perf_counter()
+print(json.dumps({
+    "import_s": t1 - t0,
+    "construct_s": t2 - t1,
+    "first_response_s": t3 - t2,
+    "total_s": t3 - t0,
+}))
+"""
+
+
+def measure_once(data_file):
+    """Run one cold start in a child process and return its timings"""
+    result = subprocess.run(
+        [sys.executable, "-c", CHILD_SCRIPT, data_file],
+        cwd=REPO_ROOT, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise SystemExit("Cold start failed:\n" + result.stderr)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure chatbot cold-start time")
+    parser.add_argument("--data-file", default=os.path.join(REPO_ROOT, "customer_support_data.json"))
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    runs = [measure_once(args.data_file) for _ in range(args.runs)]
+    summary = {
+        key: statistics.median(run[key] for run in runs)
+        for key in runs[0]
+    }
+    print(json.dumps({"runs": runs, "median": summary}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Synthetic intent catalogs and query mixes for benchmarking
+
+Generates catalogs in the customer_support_data.json schema, from a handful
+of intents up to 10k intents / 100k patterns, plus query mixes made of exact
+pattern hits, partial keyword hits and misses. Output is deterministic for a
+given seed so results can be compared between commits.
+
+Usage:
+    python tools/synth_catalog.py --intents 1000 --patterns-per-intent 10 -o catalog.json
+"""
+import argparse
+import json
+import os
+import random
+
+# The catalog shipped with the chatbot
+SHIPPED_CATALOG = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               "customer_support_data.json")
+
+SYLLABLES = [
+    "ka", "lo", "mi", "ter", "son", "ra", "vel", "dor", "pin", "shi",
+    "tu", "ber", "gan", "fo", "lex", "qui", "mar", "zo", "net", "pra",
+]
+FILLER_WORDS = ["i", "my", "the", "to", "can", "how", "do", "is", "a", "for", "with", "please"]
+ENTITY_SNIPPETS = [
+    "order number AB12345678", "product code XK200", "reach me at user@example.com",
+    "placed on 12/05/2024", "order #QWE98765",
+]
+
+
+def make_vocabulary(size, rng):
+    """Distinct made-up words built from syllables"""
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def make_catalog(n_intents, patterns_per_intent=10, responses_per_intent=3,
+                 vocabulary_size=None, seed=0):
+    """
+    Build a catalog dict in the customer_support_data.json schema
+
+    Each intent draws its patterns mostly from a small topic vocabulary of its
+    own plus shared words, so keyword overlap between intents is realistic.
+    """
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(vocabulary_size or max(200, n_intents * 5), rng)
+    shared = vocabulary[:max(20, len(vocabulary) // 50)]
+
+    intents = []
+    for intent_idx in range(n_intents):
+        topic = rng.sample(vocabulary, 6)
+        patterns = set()
+        while len(patterns) < patterns_per_intent:
+            words = rng.sample(topic, rng.randint(1, 3))
+            words += rng.sample(shared, rng.randint(0, 2))
+            words += rng.sample(FILLER_WORDS, rng.randint(0, 3))
+            rng.shuffle(words)
+            patterns.add(" ".join(words).capitalize())
+        intents.append({
+            "tag": "intent_{}".format(intent_idx),
+            "patterns": sorted(patterns),
+            "responses": [
+                "Response {} for intent {}.".format(i, intent_idx)
+                for i in range(responses_per_intent)
+            ],
+        })
+    return {"intents": intents}
+
+
+def write_catalog(n_intents, directory, patterns_per_intent=10, name="catalog"):
+    """
+    Return (path, catalog) for a tool run
+
+    With n_intents 0 this is the shipped catalog; otherwise a synthetic
+    catalog is written to directory/NAME.json.
+    """
+    if not n_intents:
+        with open(SHIPPED_CATALOG) as file:
+            return SHIPPED_CATALOG, json.load(file)
+
+    catalog = make_catalog(n_intents, patterns_per_intent)
+    path = os.path.join(directory, "{}.json".format(name))
+    with open(path, "w") as file:
+        json.dump(catalog, file)
+    return path, catalog
+
+
+def make_queries(catalog, n_queries, exact_ratio=0.3, partial_ratio=0.5, seed=1):
+    """
+    Build a query mix for a catalog
+
+    exact_ratio of the queries repeat a pattern verbatim, partial_ratio keep
+    some of a pattern's words plus noise (and sometimes an entity), and the
+    rest use words that never appear in the catalog.
+    """
+    rng = random.Random(seed)
+    patterns = [pattern for intent in catalog["intents"] for pattern in intent["patterns"]]
+    unknown = ["zzq{}".format(i) for i in range(1000)]
+
+    queries = []
+    for _ in range(n_queries):
+        draw = rng.random()
+        if draw < exact_ratio:
+            query = rng.choice(patterns)
+        elif draw < exact_ratio + partial_ratio:
+            words = rng.choice(patterns).split()
+            kept = rng.sample(words, max(1, len(words) // 2 + rng.randint(0, 1)))
+            kept += rng.sample(FILLER_WORDS, rng.randint(0, 2))
+            if rng.random() < 0.2:
+                kept.append(rng.choice(ENTITY_SNIPPETS))
+            query = " ".join(kept)
+        else:
+            query = " ".join(rng.sample(unknown, rng.randint(1, 4)))
+        queries.append(query)
+    return queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic intent catalog")
+    parser.add_argument("--intents", type=int, default=1000)
+    parser.add_argument("--patterns-per-intent", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", required=True)
+    parser.add_argument("--queries", type=int, default=0,
+                        help="Also write this many queries to OUTPUT.queries.jsonl")
+    args = parser.parse_args()
+
+    catalog = make_catalog(args.intents, args.patterns_per_intent, seed=args.seed)
+    with open(args.output, "w") as file:
+        json.dump(catalog, file, indent=1)
+
+    if args.queries:
+        with open(args.output + ".queries.jsonl", "w") as file:
+            for query in make_queries(catalog, args.queries, seed=args.seed + 1):
+                file.write(json.dumps({"text": query}) + "\n")
+
+
+if __name__ == "__main__":
+    main()
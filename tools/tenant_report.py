@@ -0,0 +1,89 @@
+"""
+Memory and eviction report for multi-tenant hosting
+
+Writes synthetic catalogs for a number of tenants (brands) that overlap the
+way related brands do, then reports:
+  - memory traced by tracemalloc for fully independent EntityAwareChatbot
+    instances against a CatalogRegistry with every tenant loaded
+  - a CatalogRegistry under a memory budget serving requests whose tenants
+    follow a skewed (Zipf-like) popularity, with its load/eviction stats
+    (evicted catalogs are reloaded from snapshots)
+
+Usage:
+    python tools/tenant_report.py [--tenants N] [--intents I] [--budget-fraction F] [--requests R]
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import main_code
+from memory_report import traced_bytes
+from synth_catalog import make_catalog, make_queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare independent chatbots with a shared catalog registry")
+    parser.add_argument("--tenants", type=int, default=50)
+    parser.add_argument("--intents", type=int, default=100, help="Intents per tenant catalog")
+    parser.add_argument("--catalog-seeds", type=int, default=10,
+                        help="Distinct vocabularies the tenant catalogs are drawn from")
+    parser.add_argument("--budget-fraction", type=float, default=0.25,
+                        help="Memory budget as a fraction of all tenants' models")
+    parser.add_argument("--requests", type=int, default=5000)
+    args = parser.parse_args()
+
+    logging.getLogger(main_code.__name__).setLevel(logging.ERROR)
+    with tempfile.TemporaryDirectory() as directory:
+        catalogs = {}
+        queries = {}
+        for tenant in range(args.tenants):
+            tenant_id = "brand-{}".format(tenant)
+            catalog = make_catalog(args.intents, seed=tenant % args.catalog_seeds)
+            catalogs[tenant_id] = os.path.join(directory, tenant_id + ".json")
+            with open(catalogs[tenant_id], "w") as file:
+                json.dump(catalog, file)
+            queries[tenant_id] = make_queries(catalog, 50, seed=tenant)
+
+        _, independent = traced_bytes(lambda: [
+            main_code.EntityAwareChatbot(data_file) for data_file in catalogs.values()])
+
+        def load_all():
+            registry = main_code.CatalogRegistry(catalogs)
+            for tenant_id in catalogs:
+                registry.get(tenant_id)
+            return registry
+        registry, shared = traced_bytes(load_all)
+        model_bytes = registry.stats()["estimated_bytes"]
+
+        print("{} tenants, {} intents each".format(args.tenants, args.intents))
+        print("independent chatbots {:>14,} bytes".format(independent))
+        print("registry (all loaded) {:>13,} bytes ({:.2f} of independent)".format(shared, shared / independent))
+
+        # Skewed traffic against a registry that only fits part of the tenants
+        budget = int(model_bytes * args.budget_fraction)
+        registry = main_code.CatalogRegistry(catalogs, memory_budget=budget, save_snapshots=True)
+        tenant_ids = list(catalogs)
+        weights = [1 / rank for rank in range(1, len(tenant_ids) + 1)]
+        rng = random.Random(4)
+        start = time.perf_counter()
+        for tenant_id in rng.choices(tenant_ids, weights, k=args.requests):
+            registry.get_response(tenant_id, rng.choice(queries[tenant_id]), session_id="user")
+        elapsed = time.perf_counter() - start
+        stats = registry.stats()
+        print("budget {:,} bytes, {} requests in {:.2f}s".format(budget, args.requests, elapsed))
+        print("  loaded {loaded}, estimated {estimated_bytes:,} bytes, loads {loads}, hits {hits}, "
+              "evictions {evictions}, load time {load_seconds:.2f}s, vocabulary {vocabulary_tokens} tokens"
+              .format(**stats))
+
+
+if __name__ == "__main__":
+    main()